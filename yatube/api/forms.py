@@ -0,0 +1,14 @@
+from django import forms
+
+from posts.forms import PostForm
+from posts.models import Group
+
+
+class PostEditForm(PostForm):
+    """Форма поста для API: группа указывается по slug, а не по id."""
+
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+    )
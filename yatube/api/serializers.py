@@ -0,0 +1,204 @@
+"""Преобразование моделей в JSON с выбором полей (?fields=).
+
+Каждое поле знает, какие колонки ему нужны, поэтому выборка читает из
+базы только запрошенное, а связанные автор и группа приходят тем же
+запросом через JOIN.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.urls import reverse
+
+from posts.renditions import parse, rendition_url
+
+
+class FieldsError(ValueError):
+    pass
+
+
+class Field:
+    def __init__(self, getter, columns=()):
+        self.getter = getter
+        self.columns = columns
+
+
+def user_data(user):
+    return {
+        'username': user.username,
+        'name': user.get_full_name(),
+    }
+
+
+USER_COLUMNS = ('username', 'first_name', 'last_name')
+
+
+def related_columns(relation):
+    return tuple(f'{relation}__{column}' for column in USER_COLUMNS)
+
+
+def image_data(post):
+    if not post.image:
+        return None
+    renditions = parse(post.renditions)
+    return {
+        'url': post.image.url,
+        'renditions': [
+            {
+                'format': fmt,
+                'width': width,
+                'height': height,
+                'url': rendition_url(post.image.name, width, fmt),
+            }
+            for width, height in renditions['sizes']
+            for fmt in renditions['formats']
+        ] if renditions else [],
+    }
+
+
+def profile_count(user, field):
+    """Счётчик профиля; у пользователя без профиля — 0."""
+    try:
+        return getattr(user.profile, field)
+    except ObjectDoesNotExist:
+        return 0
+
+
+def group_summary(group):
+    if group is None:
+        return None
+    return {'slug': group.slug, 'title': group.title}
+
+
+class Serializer:
+    """Набор полей модели; запрос выбирает нужные через ?fields=."""
+
+    fields = {}
+
+    def __init__(self, request):
+        self.request = request
+        self.selected = self.parse_fields(request.GET.get('fields'))
+
+    def parse_fields(self, value):
+        if not value:
+            return list(self.fields)
+        selected = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(selected) - set(self.fields)
+        if unknown:
+            raise FieldsError(
+                'Неизвестные поля: ' + ', '.join(sorted(unknown))
+            )
+        return selected
+
+    def columns(self):
+        return {
+            column
+            for name in self.selected
+            for column in self.fields[name].columns
+        }
+
+    def prepare(self, queryset):
+        """Выборка только тех колонок, что нужны выбранным полям."""
+        columns = self.columns()
+        relations = {
+            column.split('__')[0] for column in columns if '__' in column
+        }
+        return queryset.select_related(*relations).only(
+            *columns, *relations
+        )
+
+    def url(self, name, *args):
+        return self.request.build_absolute_uri(reverse(name, args=args))
+
+    def one(self, obj):
+        return {
+            name: self.fields[name].getter(self, obj)
+            for name in self.selected
+        }
+
+    def many(self, objects):
+        return [self.one(obj) for obj in objects]
+
+
+class PostSerializer(Serializer):
+    fields = {
+        'id': Field(lambda self, post: post.pk),
+        'text': Field(lambda self, post: post.text, ('text',)),
+        'pub_date': Field(lambda self, post: post.pub_date, ('pub_date',)),
+        'author': Field(
+            lambda self, post: user_data(post.author),
+            related_columns('author'),
+        ),
+        'group': Field(
+            lambda self, post: group_summary(post.group),
+            ('group__slug', 'group__title'),
+        ),
+        'image': Field(
+            lambda self, post: image_data(post), ('image', 'renditions')
+        ),
+        'comments_count': Field(
+            lambda self, post: post.comments_count, ('comments_count',)
+        ),
+        'url': Field(lambda self, post: self.url('api:post', post.pk)),
+    }
+
+    def columns(self):
+        # pub_date нужна курсору ленты, даже если её не просили.
+        return super().columns() | {'pub_date'}
+
+
+class CommentSerializer(Serializer):
+    fields = {
+        'id': Field(lambda self, comment: comment.pk),
+        'post': Field(lambda self, comment: comment.post_id, ('post',)),
+        'text': Field(lambda self, comment: comment.text, ('text',)),
+        'created': Field(
+            lambda self, comment: comment.created, ('created',)
+        ),
+        'author': Field(
+            lambda self, comment: user_data(comment.author),
+            related_columns('author'),
+        ),
+    }
+
+    def columns(self):
+        return super().columns() | {'created', 'post'}
+
+
+class GroupSerializer(Serializer):
+    fields = {
+        'slug': Field(lambda self, group: group.slug, ('slug',)),
+        'title': Field(lambda self, group: group.title, ('title',)),
+        'description': Field(
+            lambda self, group: group.description, ('description',)
+        ),
+        'url': Field(
+            lambda self, group: self.url('api:group', group.slug), ('slug',)
+        ),
+        'posts_url': Field(
+            lambda self, group: self.url('api:group_posts', group.slug),
+            ('slug',),
+        ),
+    }
+
+
+class ProfileSerializer(Serializer):
+    """Пользователь со счётчиками профиля; following — только для
+    вошедшего пользователя."""
+
+    fields = {
+        'username': Field(lambda self, user: user.username),
+        'name': Field(lambda self, user: user.get_full_name()),
+        'posts_count': Field(
+            lambda self, user: profile_count(user, 'posts_count')
+        ),
+        'followers_count': Field(
+            lambda self, user: profile_count(user, 'followers_count')
+        ),
+        'following_count': Field(
+            lambda self, user: profile_count(user, 'following_count')
+        ),
+        'following': Field(lambda self, user: getattr(
+            user, 'is_followed', None
+        )),
+        'posts_url': Field(
+            lambda self, user: self.url('api:profile_posts', user.username)
+        ),
+    }
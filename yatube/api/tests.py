@@ -0,0 +1,247 @@
+import base64
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def basic(username, password='pass'):
+    token = base64.b64encode(f'{username}:{password}'.encode()).decode()
+    return {'HTTP_AUTHORIZATION': f'Basic {token}'}
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', password='pass', first_name='Лев',
+            last_name='Толстой',
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}'
+            )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def post_json(self, url, data, method='post', **extra):
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type='application/json', **extra
+        )
+
+    def test_feed_pages(self):
+        url = reverse('api:posts')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['previous'])
+        first = data['results'][0]
+        self.assertEqual(first['text'], 'Пост 14')
+        self.assertEqual(
+            first['author'], {'username': 'author', 'name': 'Лев Толстой'}
+        )
+        self.assertEqual(
+            first['group'], {'slug': 'test-slug', 'title': 'Тестовая группа'}
+        )
+        self.assertEqual(first['comments_count'], 1)
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    def test_other_feeds(self):
+        urls = (
+            reverse('api:group_posts', args=(self.group.slug,)),
+            reverse('api:profile_posts', args=(self.author.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(len(response.json()['results']), 10)
+        response = self.client.get(reverse('api:group_posts', args=('no',)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(
+            reverse('api:posts'), {'fields': 'id,text'}
+        )
+        for item in response.json()['results']:
+            self.assertEqual(set(item), {'id', 'text'})
+        response = self.client.get(
+            reverse('api:posts'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_detail_group_profile(self):
+        response = self.client.get(reverse('api:post', args=(self.post.pk,)))
+        self.assertEqual(response.json()['text'], 'Пост 14')
+        response = self.client.get(reverse('api:groups'))
+        self.assertEqual(
+            response.json()['results'][0]['slug'], self.group.slug
+        )
+        response = self.client.get(reverse('api:profile', args=('author',)))
+        data = response.json()
+        self.assertEqual(data['posts_count'], 15)
+        self.assertIsNone(data['following'])
+
+    def test_profile_without_counters(self):
+        self.reader.profile.delete()
+        response = self.client.get(reverse('api:profile', args=('reader',)))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['posts_count'], 0)
+
+    def test_etag(self):
+        url = reverse('api:post', args=(self.post.pk,))
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(post=self.post, author=self.reader, text='Ещё')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_create_post(self):
+        url = reverse('api:posts')
+        response = self.post_json(url, {'text': 'Новый'})
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        response = self.post_json(
+            url, {'text': 'Новый', 'group': 'test-slug'}, **basic('author')
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        post = Post.objects.get(text='Новый')
+        self.assertEqual(post.group, self.group)
+        self.assertTrue(response['Location'].endswith(f'/posts/{post.pk}/'))
+        response = self.post_json(url, {'text': ''}, **basic('author'))
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', response.json()['errors'])
+        response = self.post_json(url, {'text': 'x'}, **basic('author', 'no'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_session_writes_need_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.author)
+        response = client.post(reverse('api:posts'), {'text': 'Без CSRF'})
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.assertFalse(Post.objects.filter(text='Без CSRF').exists())
+
+    def test_edit_post(self):
+        url = reverse('api:post', args=(self.post.pk,))
+        response = self.post_json(
+            url, {'text': 'Чужая правка'}, 'patch', **basic('reader')
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        etag = self.client.get(url, **basic('author'))['ETag']
+        response = self.post_json(
+            url, {'text': 'Правка'}, 'patch',
+            HTTP_IF_MATCH=etag, **basic('author'),
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Правка')
+        self.assertEqual(self.post.group, self.group)
+        response = self.post_json(
+            url, {'text': 'Поверх'}, 'patch',
+            HTTP_IF_MATCH=etag, **basic('author'),
+        )
+        self.assertEqual(response.status_code, HTTPStatus.PRECONDITION_FAILED)
+
+    def test_edit_post_form(self):
+        url = reverse('api:post', args=(self.post.pk,))
+        response = self.client.patch(
+            url, 'text=%D0%A4%D0%BE%D1%80%D0%BC%D0%B0',
+            content_type='application/x-www-form-urlencoded',
+            **basic('author'),
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Форма')
+        response = self.client.patch(
+            url, 'text', content_type='text/plain', **basic('author')
+        )
+        self.assertEqual(
+            response.status_code, HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Форма')
+
+    def test_comments(self):
+        url = reverse('api:comments', args=(self.post.pk,))
+        response = self.post_json(url, {'text': 'Ответ'}, **basic('reader'))
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(response.json()['author']['username'], 'reader')
+        self.client.get(url)
+        # Пост и страница комментариев с авторами, без запроса на каждого.
+        with self.assertNumQueries(2):
+            results = self.client.get(url).json()['results']
+        self.assertEqual(
+            [item['text'] for item in results], ['Комментарий', 'Ответ']
+        )
+
+    def test_follow(self):
+        url = reverse('api:follow', args=('author',))
+        response = self.client.post(url, **basic('reader'))
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        response = self.client.post(url, **basic('reader'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(Follow.objects.count(), 1)
+        response = self.client.post(url, **basic('author'))
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        profile = self.client.get(
+            reverse('api:profile', args=('author',)), **basic('reader')
+        ).json()
+        self.assertTrue(profile['following'])
+        feed = self.client.get(reverse('api:follow_feed'), **basic('reader'))
+        self.assertEqual(len(feed.json()['results']), 10)
+        response = self.client.delete(url, **basic('reader'))
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Follow.objects.exists())
+        response = self.client.get(reverse('api:follow_feed'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_follow_feed_queries(self):
+        # Текст постов приходит тем же запросом, что и лента.
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse('api:follow_feed')
+        for fanout in (True, False):
+            with self.subTest(fanout=fanout):
+                Follow.objects.update(fanout=fanout)
+                cache.clear()
+                with self.assertNumQueries(3):
+                    response = self.client.get(url, **basic('reader'))
+                results = response.json()['results']
+                self.assertEqual(results[0]['text'], 'Пост 14')
+                self.assertEqual(len(results), 10)
+
+    def test_head(self):
+        for url in (
+            reverse('api:posts'), reverse('api:comments', args=(self.post.pk,))
+        ):
+            with self.subTest(url=url):
+                response = self.client.head(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn('ETag', response)
+
+    def test_method_not_allowed(self):
+        response = self.client.delete(reverse('api:groups'))
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        self.assertEqual(response['Allow'], 'GET, HEAD')
@@ -0,0 +1,28 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.posts, name='posts'),
+    path('posts/<int:post_id>/', views.post, name='post'),
+    path(
+        'posts/<int:post_id>/comments/', views.comments, name='comments'
+    ),
+    path('groups/', views.groups, name='groups'),
+    path('groups/<slug:slug>/', views.group, name='group'),
+    path(
+        'groups/<slug:slug>/posts/', views.group_posts, name='group_posts'
+    ),
+    path('feed/', views.follow_feed, name='follow_feed'),
+    path('users/<str:username>/', views.profile, name='profile'),
+    path(
+        'users/<str:username>/posts/',
+        views.profile_posts,
+        name='profile_posts'
+    ),
+    path(
+        'users/<str:username>/follow/', views.follow, name='follow'
+    ),
+]
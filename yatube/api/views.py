@@ -0,0 +1,371 @@
+"""JSON API v1: те же ленты и действия, что в posts.views, без шаблонов.
+
+Вход — сессия сайта (с проверкой CSRF для записей) или HTTP Basic.
+Ответы на GET получают ETag из поколений кэша страниц: пока данные,
+от которых зависит ответ, не менялись, повторный запрос с
+If-None-Match отвечается 304 без обращения к базе.
+"""
+import base64
+import binascii
+import json
+from functools import wraps
+from http import HTTPStatus
+
+from django.contrib.auth import authenticate
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+
+from posts import caching, renditions, thumbnails
+from posts.forms import CommentForm
+from posts.models import Follow, Group, Post, User
+from posts.timeline import get_follow_page
+from posts.utils import get_comments_page, get_page_context
+
+from .forms import PostEditForm
+from .serializers import (CommentSerializer, FieldsError, GroupSerializer,
+                          PostSerializer, ProfileSerializer)
+
+SAFE_METHODS = ('GET', 'HEAD')
+FORM_TYPE = 'application/x-www-form-urlencoded'
+
+
+class UnsupportedMediaType(Exception):
+    pass
+
+
+def error(status, detail, **extra):
+    return JsonResponse({'detail': detail, **extra}, status=status)
+
+
+def authenticate_basic(request):
+    """Вход по заголовку Authorization: Basic; False — заголовка нет."""
+    scheme, _, credentials = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    if scheme.lower() != 'basic':
+        return False
+    try:
+        username, _, password = base64.b64decode(
+            credentials
+        ).decode().partition(':')
+    except (binascii.Error, UnicodeDecodeError):
+        username = password = None
+    user = authenticate(request, username=username, password=password)
+    if user is None:
+        raise PermissionDenied('Неверное имя пользователя или пароль')
+    request.user = user
+    return True
+
+
+def csrf_failed(request):
+    # Сессию можно использовать из браузера, поэтому записи через неё
+    # проверяются на CSRF, как формы сайта.
+    return CsrfViewMiddleware().process_view(request, None, (), {})
+
+
+def scope_etag(request, scopes):
+    return quote_etag(caching.page_etag(request, scopes))
+
+
+def call(view, request, *args, **kwargs):
+    try:
+        return view(request, *args, **kwargs)
+    except Http404:
+        return error(HTTPStatus.NOT_FOUND, 'Не найдено')
+    except PermissionDenied:
+        return error(HTTPStatus.FORBIDDEN, 'Нет прав')
+    except FieldsError as exc:
+        return error(HTTPStatus.BAD_REQUEST, str(exc))
+    except UnsupportedMediaType as exc:
+        return error(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, str(exc))
+
+
+def unauthorized(detail):
+    response = error(HTTPStatus.UNAUTHORIZED, detail)
+    response['WWW-Authenticate'] = 'Basic realm="api"'
+    return response
+
+
+def reject(request, allowed, login):
+    """Ответ с ошибкой, если метод, вход или CSRF не годятся."""
+    if request.method not in allowed:
+        response = error(
+            HTTPStatus.METHOD_NOT_ALLOWED, 'Метод не поддерживается'
+        )
+        response['Allow'] = ', '.join(sorted(allowed))
+        return response
+    try:
+        by_header = authenticate_basic(request)
+    except PermissionDenied as exc:
+        return unauthorized(str(exc))
+    if request.method in login and not request.user.is_authenticated:
+        return unauthorized('Нужно войти')
+    if (request.method not in SAFE_METHODS and not by_header
+            and csrf_failed(request) is not None):
+        return error(HTTPStatus.FORBIDDEN, 'Ошибка CSRF')
+    return None
+
+
+def api_view(*methods, scopes=None, login=()):
+    """Обёртка точки API.
+
+    methods — разрешённые методы; login — те из них, что требуют входа;
+    scopes(request, **kwargs) — области кэша, от которых зависит ответ,
+    для ETag.
+    """
+    allowed = set(methods) | ({'HEAD'} if 'GET' in methods else set())
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = reject(request, allowed, login)
+            if response is not None:
+                return response
+            etag = None
+            view_scopes = ()
+            if scopes is not None and (
+                request.method in SAFE_METHODS
+                or 'HTTP_IF_MATCH' in request.META
+            ):
+                # 304 (или 412 для If-Match) отдаётся без обращения к базе.
+                view_scopes = scopes(request, **kwargs)
+                etag = scope_etag(request, view_scopes)
+                response = get_conditional_response(request, etag=etag)
+            if response is None:
+                # ETag из поколений, поэтому реплики — как у страниц сайта.
+                with caching.scope_reads(view_scopes):
+                    response = call(view, request, *args, **kwargs)
+                if (scopes is not None
+                        and response.status_code == HTTPStatus.OK):
+                    # После записи поколения сдвинулись: ETag считается
+                    # заново.
+                    if etag is None or request.method not in SAFE_METHODS:
+                        etag = scope_etag(request, scopes(request, **kwargs))
+                    response['ETag'] = etag
+            patch_vary_headers(response, ('Cookie', 'Authorization'))
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def request_data(request):
+    """Тело записи: JSON или обычная форма.
+
+    Django разбирает форму только у POST; у PATCH тело-форма читается
+    здесь, а multipart в PATCH не принимается.
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            raise ValueError('Тело запроса должно быть объектом JSON')
+        return data
+    if request.method == 'POST':
+        return request.POST
+    if request.content_type == FORM_TYPE:
+        # dict(): PATCH дополняет поля поста через **, а у QueryDict
+        # значения — списки.
+        return QueryDict(request.body, encoding=request.encoding).dict()
+    raise UnsupportedMediaType(
+        f'Тело запроса должно быть JSON или {FORM_TYPE}'
+    )
+
+
+def invalid(form):
+    return error(
+        HTTPStatus.BAD_REQUEST, 'Ошибка в данных', errors=form.errors
+    )
+
+
+def page_url(request, cursor):
+    if not cursor:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def page_response(request, page_obj, serializer):
+    paginator = page_obj.paginator
+    return JsonResponse({
+        'results': serializer.many(page_obj.object_list),
+        'next': page_url(request, paginator.next_cursor),
+        'previous': page_url(request, paginator.previous_cursor),
+    })
+
+
+def feed_response(request, posts):
+    serializer = PostSerializer(request)
+    page_obj = get_page_context(serializer.prepare(posts), request)
+    return page_response(request, page_obj, serializer)
+
+
+@api_view(
+    'GET', 'POST', login=('POST',),
+    scopes=lambda request: caching.feed_scopes(),
+)
+def posts(request):
+    if request.method in SAFE_METHODS:
+        return feed_response(request, Post.objects.all())
+    try:
+        data = request_data(request)
+    except ValueError as exc:
+        return error(HTTPStatus.BAD_REQUEST, str(exc))
+    form = PostEditForm(data, request.FILES or None)
+    if not form.is_valid():
+        return invalid(form)
+    post = form.save(commit=False)
+    post.author = request.user
+    post.save()
+    thumbnails.schedule(post.image)
+    renditions.schedule(post)
+    response = JsonResponse(
+        PostSerializer(request).one(post), status=HTTPStatus.CREATED
+    )
+    response['Location'] = request.build_absolute_uri(
+        reverse('api:post', args=(post.pk,))
+    )
+    return response
+
+
+@api_view(
+    'GET', 'PATCH', login=('PATCH',),
+    scopes=lambda request, post_id: caching.post_scopes(post_id),
+)
+def post(request, post_id):
+    serializer = PostSerializer(request)
+    if request.method != 'PATCH':
+        post = get_object_or_404(
+            serializer.prepare(Post.objects.all()), pk=post_id
+        )
+        return JsonResponse(serializer.one(post))
+    post = get_object_or_404(Post, pk=post_id)
+    if post.author_id != request.user.pk:
+        raise PermissionDenied
+    try:
+        data = request_data(request)
+    except ValueError as exc:
+        return error(HTTPStatus.BAD_REQUEST, str(exc))
+    # PATCH меняет только переданные поля, остальные берутся из поста.
+    form = PostEditForm({
+        'text': post.text,
+        'group': post.group.slug if post.group_id else '',
+        **data,
+    }, instance=post)
+    if not form.is_valid():
+        return invalid(form)
+    post = form.save()
+    return JsonResponse(serializer.one(post))
+
+
+@api_view(
+    'GET', 'POST', login=('POST',),
+    scopes=lambda request, post_id: caching.post_scopes(post_id),
+)
+def comments(request, post_id):
+    if request.method in SAFE_METHODS:
+        post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+        serializer = CommentSerializer(request)
+        page_obj = get_comments_page(
+            serializer.prepare(post.comments.all()), request
+        )
+        return page_response(request, page_obj, serializer)
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    try:
+        data = request_data(request)
+    except ValueError as exc:
+        return error(HTTPStatus.BAD_REQUEST, str(exc))
+    form = CommentForm(data)
+    if not form.is_valid():
+        return invalid(form)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    return JsonResponse(
+        CommentSerializer(request).one(comment), status=HTTPStatus.CREATED
+    )
+
+
+@api_view('GET', scopes=lambda request: caching.feed_scopes())
+def groups(request):
+    serializer = GroupSerializer(request)
+    groups = serializer.prepare(Group.objects.order_by('title'))
+    return JsonResponse({'results': serializer.many(groups)})
+
+
+@api_view('GET', scopes=lambda request, slug: caching.group_scopes(slug))
+def group(request, slug):
+    serializer = GroupSerializer(request)
+    group = get_object_or_404(serializer.prepare(Group.objects), slug=slug)
+    return JsonResponse(serializer.one(group))
+
+
+@api_view('GET', scopes=lambda request, slug: caching.group_scopes(slug))
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return feed_response(request, group.posts.all())
+
+
+@api_view(
+    'GET', scopes=lambda request, username: caching.profile_scopes(username)
+)
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    if request.user.is_authenticated:
+        author.is_followed = Follow.objects.filter(
+            user=request.user, author=author
+        ).exists()
+    return JsonResponse(ProfileSerializer(request).one(author))
+
+
+@api_view(
+    'GET', scopes=lambda request, username: caching.profile_scopes(username)
+)
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return feed_response(request, author.posts.all())
+
+
+@api_view(
+    'GET', login=('GET', 'HEAD'),
+    # Лента меняется с новыми постами и с подписками пользователя.
+    scopes=lambda request: [
+        *caching.feed_scopes(),
+        (caching.AUTHOR, request.user.pk),
+    ],
+)
+def follow_feed(request):
+    serializer = PostSerializer(request)
+    page_obj = get_follow_page(request.user, request, serializer.columns())
+    return page_response(request, page_obj, serializer)
+
+
+@api_view('POST', 'DELETE', login=('POST', 'DELETE'))
+def follow(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    if request.method == 'DELETE':
+        Follow.objects.filter(user=request.user, author=author).delete()
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+    if author == request.user:
+        return error(HTTPStatus.BAD_REQUEST, 'Нельзя подписаться на себя')
+    _, created = Follow.objects.get_or_create(
+        user=request.user, author=author
+    )
+    return JsonResponse(
+        {'following': True},
+        status=HTTPStatus.CREATED if created else HTTPStatus.OK,
+    )
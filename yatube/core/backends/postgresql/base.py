@@ -0,0 +1,82 @@
+"""PostgreSQL с пулом соединений внутри процесса.
+
+Закрытое Django соединение не рвётся, а возвращается в пул
+(psycopg2 ThreadedConnectionPool) и достаётся следующему запросу этого
+процесса. Размер пула задают OPTIONS['pool_min_size'] и
+OPTIONS['pool_max_size']; верхний предел должен быть не меньше числа
+потоков воркера, иначе getconn() упадёт с PoolError.
+"""
+import threading
+
+from django.db.backends.postgresql import base, creation
+from psycopg2 import pool
+
+POOL_OPTIONS = ('pool_min_size', 'pool_max_size')
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, min_size, max_size):
+    # Тестовая база подключается с другим именем, и пул у неё свой.
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        connection_pool = _pools.get(key)
+        if connection_pool is None or connection_pool.closed:
+            connection_pool = _pools[key] = pool.ThreadedConnectionPool(
+                min_size, max_size, **conn_params
+            )
+        return connection_pool
+
+
+def close_pools():
+    with _pools_lock:
+        for connection_pool in _pools.values():
+            if not connection_pool.closed:
+                connection_pool.closeall()
+        _pools.clear()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # DROP DATABASE не пройдёт, пока пул держит к ней соединения.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    connection_pool = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in POOL_OPTIONS:
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict['OPTIONS']
+        self.connection_pool = get_pool(
+            self.alias, conn_params,
+            options.get('pool_min_size', 1), options.get('pool_max_size', 10),
+        )
+        connection = self.connection_pool.getconn()
+        # Как в родительском методе, но для соединения из пула.
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.connection_pool is None or self.connection_pool.closed:
+                return self.connection.close()
+            # putconn сам откатит незавершённую транзакцию, а разорванное
+            # соединение закроет вместо того, чтобы вернуть в пул.
+            self.connection_pool.putconn(self.connection)
@@ -0,0 +1,20 @@
+"""SQLite с прагмами из OPTIONS['pragmas'], которые ставятся при подключении.
+
+Прагмы действуют только на своё соединение (кроме journal_mode, который
+запоминается в файле базы), поэтому их нужно повторять на каждом новом.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
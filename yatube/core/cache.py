@@ -0,0 +1,220 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.signals import request_started
+
+from .instrumentation import record_cache
+
+STAMP_KEY = 'two-tier:stamp'
+IMMUTABLE = 'immutable'
+MUTABLE = 'mutable'
+MISSING = object()
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class LocalTier:
+    """LRU процесса и штамп общего кэша, с которым он согласован."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stamp = None
+        self.synced = False
+
+    def expire_sync(self, **kwargs):
+        self.synced = False
+
+    def reset(self, stamp=None, everything=False):
+        """Сбрасывает изменяемые ключи; неизменяемые остаются верны."""
+        if everything:
+            self.entries.clear()
+        else:
+            for key in [k for k, entry in self.entries.items() if entry[2]]:
+                del self.entries[key]
+        self.stamp = stamp
+
+
+def get_tier(name, max_entries):
+    with _tiers_lock:
+        if name not in _tiers:
+            tier = LocalTier(max_entries)
+            request_started.connect(tier.expire_sync, weak=False)
+            _tiers[name] = tier
+        return _tiers[name]
+
+
+class TwoTierCache(BaseCache):
+    """Маленький LRU в памяти процесса перед общим кэшем.
+
+    В локальный уровень попадают только ключи с префиксами из опций:
+    LOCAL_IMMUTABLE_PREFIXES — значение под таким ключом не меняется
+    (страницы, фрагменты шаблонов), запись его ничего не сбрасывает;
+    LOCAL_MUTABLE_PREFIXES — перезапись, удаление или incr такого ключа
+    сдвигают общий штамп. В начале каждого запроса процесс сверяет свой
+    штамп с общим и, если другой процесс менял изменяемые ключи,
+    сбрасывает их локальные копии. Прочие ключи (сессии и т. п.) идут
+    прямо в общий кэш и штамп не трогают. add() штамп не сдвигает:
+    ключ, которого не было, не мог попасть в чужой локальный уровень.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._immutable = tuple(options.get('LOCAL_IMMUTABLE_PREFIXES', ()))
+        # Без опций локально хранится всё и всё считается изменяемым.
+        self._mutable = tuple(options.get('LOCAL_MUTABLE_PREFIXES', ('',)))
+        self._tier = get_tier(
+            location or self._shared_alias,
+            options.get('LOCAL_MAX_ENTRIES', 1000),
+        )
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_expiry(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None or timeout > self._local_timeout:
+            timeout = self._local_timeout
+        return time.time() + timeout if timeout > 0 else None
+
+    def _kind(self, key):
+        """IMMUTABLE, MUTABLE или None — ключ не хранится локально."""
+        if key.startswith(self._immutable):
+            return IMMUTABLE
+        if key.startswith(self._mutable):
+            return MUTABLE
+        return None
+
+    def _store(self, key, value, timeout=DEFAULT_TIMEOUT, kind=MUTABLE):
+        expiry = self._local_expiry(timeout)
+        tier = self._tier
+        with tier.lock:
+            if expiry is None:
+                tier.entries.pop(key, None)
+                return
+            tier.entries[key] = (
+                pickle.dumps(value), expiry, kind == MUTABLE
+            )
+            tier.entries.move_to_end(key)
+            while len(tier.entries) > tier.max_entries:
+                tier.entries.popitem(last=False)
+
+    def _shared_stamp(self):
+        stamp = self.shared.get(STAMP_KEY)
+        if stamp is None:
+            # Штамп от времени: после вытеснения или clear() он не совпадёт
+            # ни с одним штампом, запомненным воркерами раньше.
+            self.shared.add(STAMP_KEY, time.time_ns(), None)
+            stamp = self.shared.get(STAMP_KEY)
+        return stamp
+
+    def _sync(self):
+        tier = self._tier
+        if tier.synced:
+            return
+        stamp = self._shared_stamp()
+        with tier.lock:
+            if stamp != tier.stamp:
+                tier.reset(stamp)
+            tier.synced = True
+
+    def _bump(self):
+        tier = self._tier
+        try:
+            stamp = self.shared.incr(STAMP_KEY)
+        except ValueError:
+            stamp = self._shared_stamp()
+            with tier.lock:
+                tier.reset(stamp)
+                tier.synced = True
+            return
+        with tier.lock:
+            # Свою запись локальный уровень уже учёл; если же штамп ушёл
+            # дальше, между делом писал кто-то ещё.
+            if tier.stamp is None or stamp != tier.stamp + 1:
+                tier.reset(stamp)
+            else:
+                tier.stamp = stamp
+
+    def get(self, key, default=None, version=None):
+        kind = self._kind(key)
+        if kind is None:
+            return self._get_shared(key, default, version)
+        if kind == MUTABLE:
+            self._sync()
+        local_key = self.make_key(key, version)
+        tier = self._tier
+        with tier.lock:
+            entry = tier.entries.get(local_key)
+            if entry is not None:
+                data, expiry, _ = entry
+                if expiry > time.time():
+                    tier.entries.move_to_end(local_key)
+                    record_cache(hit=True)
+                    return pickle.loads(data)
+                del tier.entries[local_key]
+        value = self._get_shared(key, MISSING, version)
+        if value is MISSING:
+            return default
+        self._store(local_key, value, kind=kind)
+        return value
+
+    def _get_shared(self, key, default, version):
+        value = self.shared.get(key, MISSING, version=version)
+        record_cache(hit=value is not MISSING)
+        return default if value is MISSING else value
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        kind = self._kind(key)
+        if added and kind is not None:
+            self._store(self.make_key(key, version), value, timeout, kind)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        kind = self._kind(key)
+        if kind is None:
+            return
+        if kind == MUTABLE:
+            self._bump()
+        self._store(self.make_key(key, version), value, timeout, kind)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        kind = self._kind(key)
+        if kind is None:
+            return
+        if kind == MUTABLE:
+            self._bump()
+        with self._tier.lock:
+            self._tier.entries.pop(self.make_key(key, version), None)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        kind = self._kind(key)
+        if kind == MUTABLE:
+            self._bump()
+        if kind is not None:
+            self._store(self.make_key(key, version), value, kind=kind)
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        with self._tier.lock:
+            self._tier.reset(everything=True)
+            self._tier.synced = False
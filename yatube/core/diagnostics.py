@@ -0,0 +1,125 @@
+"""Медленные и повторяющиеся запросы к базе.
+
+Для запросов, попавших в выборку замеров, каждый SQL-запрос приводится
+к отпечатку: литералы, числа и списки параметров заменяются на ?.
+Отпечаток, повторившийся за запрос DUPLICATE_QUERY_THRESHOLD раз, —
+признак N+1; запросы дольше SLOW_QUERY_MS — медленные. И те, и другие
+пишутся в журнал yatube.queries строками JSON с представлением, строкой
+кода и строкой шаблона, откуда пришёл запрос.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from collections import defaultdict
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.template.base import Node
+
+logger = logging.getLogger('yatube.queries')
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'%s|\?')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+_RENDER_ANNOTATED = Node.render_annotated.__code__
+# Кадры этих файлов — сама диагностика, а не источник запроса.
+_SKIP_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('diagnostics.py', 'instrumentation.py')
+}
+
+
+def normalize(sql):
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    sql = _PLACEHOLDERS.sub('?', sql)
+    sql = _LISTS.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    """Короткий отпечаток запроса без конкретных значений."""
+    return hashlib.md5(normalize(sql).encode()).hexdigest()[:12]
+
+
+def origin():
+    """Строка кода проекта и узел шаблона, из которых пришёл запрос."""
+    code = template = None
+    frame = sys._getframe(1)
+    while frame is not None and not (code and template):
+        if template is None and frame.f_code is _RENDER_ANNOTATED:
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            node_origin = getattr(node, 'origin', None)
+            if token is not None and node_origin is not None:
+                name = node_origin.template_name or node_origin.name
+                template = f'{name}:{token.lineno}'
+        if code is None:
+            filename = frame.f_code.co_filename
+            if (filename.startswith(settings.BASE_DIR)
+                    and filename not in _SKIP_FILES):
+                path = os.path.relpath(filename, settings.BASE_DIR)
+                code = f'{path}:{frame.f_lineno}'
+        frame = frame.f_back
+    return code, template
+
+
+def report(view_name, path, statements):
+    """Пишет в журнал повторы и медленные запросы одного HTTP-запроса.
+
+    statements — список (sql, секунды, код, шаблон).
+    """
+    groups = defaultdict(list)
+    for statement in statements:
+        groups[fingerprint(statement[0])].append(statement)
+    slow = settings.SLOW_QUERY_MS / 1000
+    for key, group in groups.items():
+        sql, _, code, template = group[0]
+        if len(group) >= settings.DUPLICATE_QUERY_THRESHOLD:
+            logger.warning('duplicate_query', extra={'data': {
+                'view': view_name,
+                'path': path,
+                'fingerprint': key,
+                'count': len(group),
+                'total_ms': round(sum(item[1] for item in group) * 1000, 3),
+                'sql': normalize(sql),
+                'code': code,
+                'template': template,
+            }})
+        for sql, duration, code, template in group:
+            if duration >= slow:
+                logger.warning('slow_query', extra={'data': {
+                    'view': view_name,
+                    'path': path,
+                    'fingerprint': key,
+                    'ms': round(duration * 1000, 3),
+                    'sql': normalize(sql),
+                    'code': code,
+                    'template': template,
+                }})
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON."""
+
+    def format(self, record):
+        return json.dumps({
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'event': record.getMessage(),
+            **getattr(record, 'data', {}),
+        }, ensure_ascii=False)
+
+
+class QueryLogHandler(RotatingFileHandler):
+    """Ротируемый файл журнала; папка создаётся при первой записи."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
@@ -0,0 +1,256 @@
+"""Замеры времени запросов: SQL, шаблоны, кэш и общее время.
+
+Замер включается для доли запросов PERF_SAMPLE_RATE. Пока он не идёт,
+обёртка запросов к базе не установлена, а шаблоны и кэш проверяют
+только одно поле потока, так что без выборки накладных расходов почти
+нет. Итоги видны в заголовке Server-Timing и копятся в скользящих
+гистограммах по именам представлений; гистограммы свои у каждого
+процесса.
+"""
+import bisect
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import diagnostics
+
+# Границы корзин гистограммы в миллисекундах: от 0,1 мс до ~10 мин,
+# каждая следующая на 25% шире.
+BOUNDS = tuple(0.1 * 1.25 ** i for i in range(72))
+# Окно гистограмм и шаг, с которым из него выпадают старые замеры.
+WINDOW = 15 * 60
+SLOT = 60
+TIMINGS = ('total', 'sql', 'template')
+PERCENTILES = (50, 95, 99)
+
+_local = threading.local()
+
+
+def current():
+    """Замер текущего запроса или None, если запрос не попал в выборку."""
+    return getattr(_local, 'measurement', None)
+
+
+class Measurement:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.sql = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Тексты запросов с источником — для журнала медленных и повторов.
+        self.statements = [] if settings.QUERY_DIAGNOSTICS else None
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.sql += duration
+            self.queries += 1
+            if self.statements is not None:
+                self.statements.append((sql, duration, *diagnostics.origin()))
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join((
+            f'total;dur={self.total * 1000:.1f}',
+            f'db;dur={self.sql * 1000:.1f};desc="SQL: {self.queries}"',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'cache;desc="hit: {self.cache_hits}, miss: {self.cache_misses}"',
+        ))
+
+
+def record_cache(hit):
+    measurement = current()
+    if measurement is None:
+        return
+    if hit:
+        measurement.cache_hits += 1
+    else:
+        measurement.cache_misses += 1
+
+
+class Slot:
+    """Замеры одного представления за SLOT секунд."""
+
+    def __init__(self, index):
+        self.index = index
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.buckets = {name: [0] * (len(BOUNDS) + 1) for name in TIMINGS}
+
+    def add(self, measurement):
+        self.requests += 1
+        self.queries += measurement.queries
+        self.max_queries = max(self.max_queries, measurement.queries)
+        self.cache_hits += measurement.cache_hits
+        self.cache_misses += measurement.cache_misses
+        for name in TIMINGS:
+            milliseconds = getattr(measurement, name) * 1000
+            self.buckets[name][bisect.bisect_left(BOUNDS, milliseconds)] += 1
+
+
+def percentile(buckets, percent):
+    """Верхняя граница корзины, в которую попадает процентиль."""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = percent / 100 * total
+    seen = 0
+    for index, count in enumerate(buckets):
+        seen += count
+        if seen >= rank and count:
+            return round(BOUNDS[min(index, len(BOUNDS) - 1)], 1)
+    return None
+
+
+class RollingHistogram:
+    """Кольцо слотов: всё, что старше WINDOW, забывается само."""
+
+    def __init__(self, window=WINDOW, slot=SLOT):
+        self.slot = slot
+        self.slots = [None] * (window // slot)
+        self.lock = threading.Lock()
+
+    def add(self, measurement, now=None):
+        index = int((now or time.time()) // self.slot)
+        position = index % len(self.slots)
+        with self.lock:
+            slot = self.slots[position]
+            if slot is None or slot.index != index:
+                slot = self.slots[position] = Slot(index)
+            slot.add(measurement)
+
+    def summary(self, now=None):
+        index = int((now or time.time()) // self.slot)
+        with self.lock:
+            slots = [
+                slot for slot in self.slots
+                if slot is not None and index - slot.index < len(self.slots)
+            ]
+            requests = sum(slot.requests for slot in slots)
+            if not requests:
+                return None
+            result = {
+                'requests': requests,
+                'queries_mean': round(
+                    sum(slot.queries for slot in slots) / requests, 1
+                ),
+                'queries_max': max(slot.max_queries for slot in slots),
+                'cache_hits': sum(slot.cache_hits for slot in slots),
+                'cache_misses': sum(slot.cache_misses for slot in slots),
+            }
+            for name in TIMINGS:
+                buckets = [sum(counts) for counts in zip(
+                    *(slot.buckets[name] for slot in slots)
+                )]
+                for percent in PERCENTILES:
+                    result[f'{name}_p{percent}_ms'] = percentile(
+                        buckets, percent
+                    )
+        return result
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def record(view_name, measurement):
+    histogram = _histograms.get(view_name)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(view_name, RollingHistogram())
+    histogram.add(measurement)
+
+
+def summaries():
+    """Сводка по представлениям, самые медленные по p95 — первыми."""
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    rows = []
+    for view_name, histogram in histograms.items():
+        summary = histogram.summary()
+        if summary is not None:
+            rows.append(dict(view=view_name, **summary))
+    rows.sort(key=lambda row: row['total_p95_ms'] or 0, reverse=True)
+    return rows
+
+
+def reset():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+class InstrumentationMiddleware:
+    """Замеряет выборку запросов и копит итоги по представлениям."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PERF_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+        measurement = _local.measurement = Measurement()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(measurement.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.measurement = None
+        measurement.finish()
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        record(view_name, measurement)
+        if measurement.statements:
+            diagnostics.report(view_name, request.path, measurement.statements)
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response['Server-Timing'] = measurement.server_timing()
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        measurement = current()
+        if measurement is None:
+            return super().render(context, request)
+        # Время вложенного render_to_string уже входит во внешний.
+        measurement.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            measurement.template_depth -= 1
+            if not measurement.template_depth:
+                measurement.template += time.perf_counter() - started
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """Шаблоны Django, время отрисовки которых попадает в замер."""
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return TimedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
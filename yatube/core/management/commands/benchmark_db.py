@@ -0,0 +1,172 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+
+from .benchmark_urls import percentile
+
+# Как было до настройки: стандартный бэкенд Django без прагм и пула.
+STOCK_ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgresql': 'django.db.backends.postgresql',
+}
+CUSTOM_OPTIONS = ('pragmas', 'pool_min_size', 'pool_max_size')
+TABLE = 'benchmark_db_rows'
+CREATE_TABLE = {
+    'sqlite': f'CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, payload TEXT)',
+    'postgresql': (
+        f'CREATE TABLE {TABLE} (id SERIAL PRIMARY KEY, payload TEXT)'
+    ),
+}
+PAYLOAD = 'x' * 200
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность базы при одновременных чтениях '
+        'и записях: со стандартными настройками Django (соединение на '
+        'каждый запрос, без прагм и пула) и с настройками проекта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--seconds', type=float, default=5.0,
+            help='Длительность замера каждого варианта.',
+        )
+        parser.add_argument(
+            '--write-share', type=float, default=0.2,
+            help='Доля операций записи.',
+        )
+        parser.add_argument(
+            '--rows', type=int, default=10000,
+            help='Сколько строк положить в таблицу перед замером.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        if connection.vendor not in STOCK_ENGINES:
+            raise CommandError(f'База {connection.vendor} не поддерживается')
+        directory = tempfile.mkdtemp()
+        try:
+            results = {
+                name: self.run(name, settings_dict, connection.vendor, options)
+                for name, settings_dict in self.variants(
+                    connection.settings_dict, connection.vendor, directory
+                )
+            }
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<7} чтений {result["reads"]:>8.0f}/с  '
+                f'записей {result["writes"]:>8.0f}/с  '
+                f'ошибок {result["errors"]:>4}  '
+                f'p95 {result["p95_ms"]:>7.2f} мс'
+            )
+        before, after = results['before'], results['after']
+        total_before = before['reads'] + before['writes']
+        if total_before:
+            speedup = (after['reads'] + after['writes']) / total_before
+            self.stdout.write(f'Операций в секунду: x{speedup:.2f}')
+
+    def variants(self, configured, vendor, directory):
+        before = {
+            **configured,
+            'ENGINE': STOCK_ENGINES[vendor],
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                key: value for key, value in configured['OPTIONS'].items()
+                if key not in CUSTOM_OPTIONS
+            },
+        }
+        after = dict(configured)
+        if vendor == 'sqlite':
+            # journal_mode запоминается в файле, поэтому у каждого
+            # варианта своя свежая база.
+            before['NAME'] = os.path.join(directory, 'before.sqlite3')
+            after['NAME'] = os.path.join(directory, 'after.sqlite3')
+        return ('before', before), ('after', after)
+
+    def run(self, name, settings_dict, vendor, options):
+        alias = f'benchmark-{name}'
+        connections.databases[alias] = settings_dict
+        try:
+            self.prepare(alias, vendor, options['rows'])
+            deadline = time.monotonic() + options['seconds']
+            stats = []
+            threads = [
+                threading.Thread(target=self.work, args=(
+                    alias, deadline, options, stats, seed
+                ))
+                for seed in range(options['threads'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with connections[alias].cursor() as cursor:
+                cursor.execute(f'DROP TABLE {TABLE}')
+        finally:
+            connections[alias].close()
+            del connections.databases[alias]
+        latencies = [value for item in stats for value in item['latencies']]
+        return {
+            'reads': sum(item['reads'] for item in stats) / options['seconds'],
+            'writes': (
+                sum(item['writes'] for item in stats) / options['seconds']
+            ),
+            'errors': sum(item['errors'] for item in stats),
+            'p95_ms': (
+                percentile(latencies, 95) * 1000 if latencies else 0.0
+            ),
+        }
+
+    def prepare(self, alias, vendor, rows):
+        with transaction.atomic(using=alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+                cursor.execute(CREATE_TABLE[vendor])
+                cursor.executemany(
+                    f'INSERT INTO {TABLE} (payload) VALUES (%s)',
+                    [(PAYLOAD,)] * rows,
+                )
+
+    def work(self, alias, deadline, options, stats, seed):
+        rng = random.Random(seed)
+        connection = connections[alias]
+        result = {'reads': 0, 'writes': 0, 'errors': 0, 'latencies': []}
+        try:
+            while time.monotonic() < deadline:
+                write = rng.random() < options['write_share']
+                started = time.perf_counter()
+                try:
+                    with connection.cursor() as cursor:
+                        if write:
+                            cursor.execute(
+                                f'INSERT INTO {TABLE} (payload) VALUES (%s)',
+                                [PAYLOAD],
+                            )
+                        else:
+                            cursor.execute(
+                                f'SELECT id, payload FROM {TABLE} '
+                                f'WHERE id > %s ORDER BY id LIMIT 20',
+                                [rng.randrange(options['rows'])],
+                            )
+                            cursor.fetchall()
+                except OperationalError:
+                    result['errors'] += 1
+                else:
+                    result['writes' if write else 'reads'] += 1
+                result['latencies'].append(time.perf_counter() - started)
+                # Как в конце HTTP-запроса: при CONN_MAX_AGE=0 соединение
+                # закрывается и следующий запрос откроет новое.
+                connection.close_if_unusable_or_obsolete()
+        finally:
+            connection.close()
+            stats.append(result)
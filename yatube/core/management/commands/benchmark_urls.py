@@ -0,0 +1,214 @@
+import json
+import platform
+import statistics
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from posts.models import Group, Post, Profile
+
+User = get_user_model()
+
+NAMESPACES = ('posts', 'users', 'about', 'api')
+PERCENTILES = (50, 90, 95, 99)
+# После этих адресов клиента нужно заново залогинить.
+LOGS_OUT = ('users:logout',)
+
+
+def url_names(namespaces=NAMESPACES):
+    """Имена всех маршрутов приложений в порядке объявления."""
+    for pattern in get_resolver().url_patterns:
+        if not isinstance(pattern, URLResolver):
+            continue
+        if pattern.namespace not in namespaces:
+            continue
+        for route in pattern.url_patterns:
+            if route.name:
+                yield f'{pattern.namespace}:{route.name}', route.pattern
+
+
+def sample_kwargs():
+    """Параметры маршрутов: самые тяжёлые объекты набора данных."""
+    author = Profile.objects.select_related('user').order_by(
+        '-posts_count'
+    ).first()
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    group = Group.objects.order_by('-pk').first()
+    return {
+        'username': author.user.username if author else 'nobody',
+        'post_id': post.pk if post else 1,
+        'slug': group.slug if group else 'nothing',
+        'uidb64': 'MQ',
+        'token': 'set-password',
+    }
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(timings, queries, statuses):
+    return {
+        'requests': len(timings),
+        'mean_ms': round(statistics.mean(timings), 3),
+        **{
+            f'p{percent}_ms': round(percentile(timings, percent), 3)
+            for percent in PERCENTILES
+        },
+        'max_ms': round(max(timings), 3),
+        'queries': max(queries),
+        'statuses': sorted(set(statuses)),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку и число запросов к базе для всех адресов '
+        'posts, users, about и api и пишет результат в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Сколько раз запрашивать каждый адрес.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=3,
+            help='Сколько первых запросов не учитывать.',
+        )
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Куда записать результаты.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Прошлый файл результатов: показать, что стало медленнее.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=1.2,
+            help='Во сколько раз должен вырасти p95, чтобы это считалось '
+                 'регрессией.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--only', nargs='+', default=(),
+            help='Замерять только эти имена маршрутов.',
+        )
+
+    def handle(self, *args, **options):
+        user = self.benchmark_user()
+        kwargs = sample_kwargs()
+        results = {}
+        for name, pattern in url_names():
+            if options['only'] and name not in options['only']:
+                continue
+            url = reverse(name, kwargs={
+                key: kwargs[key] for key in pattern.converters
+            })
+            for role in ('anonymous', 'authenticated'):
+                client = Client()
+                if role == 'authenticated':
+                    client.force_login(user)
+                results[f'{name} [{role}]'] = dict(
+                    url=url, **self.measure(client, user, name, url, options)
+                )
+                self.stdout.write(self.line(name, role, results))
+        report = {
+            'created': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cache': settings.CACHES['default']['BACKEND'],
+                'cold_cache': options['cold'],
+            },
+            'dataset': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'groups': Group.objects.count(),
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+        if options['compare']:
+            self.compare(options['compare'], results, options['threshold'])
+
+    def benchmark_user(self):
+        """Пользователь с самой большой лентой подписок."""
+        profile = Profile.objects.select_related('user').order_by(
+            '-following_count'
+        ).first()
+        if profile:
+            return profile.user
+        return User.objects.get_or_create(username='benchmark')[0]
+
+    def measure(self, client, user, name, url, options):
+        # Подписки, отписки и прочие записи откатываются, чтобы замер не
+        # менял набор данных для следующих адресов и прогонов.
+        with transaction.atomic():
+            result = self.run_requests(client, user, name, url, options)
+            transaction.set_rollback(True)
+        return result
+
+    def run_requests(self, client, user, name, url, options):
+        timings, queries, statuses = [], [], []
+        for attempt in range(options['warmup'] + options['requests']):
+            if options['cold']:
+                cache.clear()
+            if name in LOGS_OUT and attempt:
+                client.force_login(user)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - started
+            if attempt < options['warmup']:
+                continue
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+            statuses.append(response.status_code)
+        return summarize(timings, queries, statuses)
+
+    def line(self, name, role, results):
+        result = results[f'{name} [{role}]']
+        return (
+            f'{name:<32} {role:<14} p50 {result["p50_ms"]:>8.2f} мс  '
+            f'p95 {result["p95_ms"]:>8.2f} мс  '
+            f'запросов {result["queries"]:>3}  {result["statuses"]}'
+        )
+
+    def compare(self, path, results, threshold):
+        with open(path) as file:
+            previous = json.load(file)['results']
+        regressions = 0
+        for key, result in results.items():
+            before = previous.get(key)
+            if before is None:
+                continue
+            slower = result['p95_ms'] > before['p95_ms'] * threshold
+            more_queries = result['queries'] > before['queries']
+            if slower or more_queries:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(
+                    f'{key}: p95 {before["p95_ms"]} -> {result["p95_ms"]} мс, '
+                    f'запросов {before["queries"]} -> {result["queries"]}'
+                ))
+        if regressions:
+            self.stdout.write(self.style.ERROR(f'Регрессий: {regressions}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
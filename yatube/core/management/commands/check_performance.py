@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+from django.utils.module_loading import import_string
+
+from core import staticfiles
+from core.cache import TwoTierCache
+
+PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+DB_SESSIONS = 'django.contrib.sessions.backends.db'
+MAX_SAMPLE_RATE = 0.1
+
+
+def check_debug():
+    if settings.DEBUG:
+        return (
+            'DEBUG включён: каждый SQL-запрос копится в connection.queries, '
+            'шаблоны не кэшируются'
+        )
+
+
+def check_template_loaders():
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        if engine.engine.debug:
+            return f'Шаблоны {engine.name}: включён режим отладки'
+        if not any(
+            isinstance(loader, CachedLoader)
+            for loader in engine.engine.template_loaders
+        ):
+            return (
+                f'Шаблоны {engine.name}: нет cached.Loader, шаблон '
+                'разбирается заново при каждом рендере'
+            )
+
+
+def check_connections():
+    for alias in connections:
+        if not connections.databases[alias].get('CONN_MAX_AGE'):
+            return (
+                f'База {alias}: CONN_MAX_AGE=0, соединение открывается '
+                'на каждый запрос'
+            )
+
+
+def check_sqlite_journal():
+    for alias in connections:
+        if connections[alias].vendor != 'sqlite':
+            continue
+        options = connections.databases[alias].get('OPTIONS', {})
+        mode = options.get('pragmas', {}).get('journal_mode', '')
+        if mode.upper() != 'WAL':
+            return (
+                f'База {alias}: журнал SQLite не WAL, запись блокирует '
+                'чтения'
+            )
+
+
+def check_shared_cache():
+    cache = caches['default']
+    if isinstance(cache, TwoTierCache):
+        cache = cache.shared
+    backend = f'{type(cache).__module__}.{type(cache).__name__}'
+    if backend in PROCESS_CACHES:
+        return (
+            f'Кэш {backend} живёт в одном процессе: воркеры не видят '
+            'страниц и поколений друг друга'
+        )
+
+
+def check_static_storage():
+    storage = import_string(settings.STATICFILES_STORAGE)
+    if not issubclass(storage, ManifestFilesMixin):
+        return (
+            'Статика без хэша в именах файлов: браузеру нельзя '
+            'кэшировать её надолго'
+        )
+
+
+def check_brotli():
+    storage = import_string(settings.STATICFILES_STORAGE)
+    if (issubclass(storage, staticfiles.CompressedManifestStaticFilesStorage)
+            and staticfiles.brotli is None):
+        return (
+            'Нет модуля brotli: collectstatic не делает копий .br, '
+            'браузеры получают более тяжёлый gzip'
+        )
+
+
+def check_sessions():
+    if settings.SESSION_ENGINE == DB_SESSIONS:
+        return 'Сессии в базе: запрос к базе на каждый просмотр страницы'
+
+
+def check_sampling():
+    if settings.PERF_SAMPLE_RATE > MAX_SAMPLE_RATE:
+        return (
+            f'PERF_SAMPLE_RATE={settings.PERF_SAMPLE_RATE}: замеры и '
+            'журнал запросов идут для слишком большой доли запросов'
+        )
+
+
+def check_thumbnails():
+    if not settings.THUMBNAIL_WORKERS:
+        return 'THUMBNAIL_WORKERS=0: миниатюры строятся внутри запроса'
+
+
+CHECKS = (
+    check_debug,
+    check_template_loaders,
+    check_connections,
+    check_sqlite_journal,
+    check_shared_cache,
+    check_static_storage,
+    check_brotli,
+    check_sessions,
+    check_sampling,
+    check_thumbnails,
+)
+
+
+def find_problems():
+    """Описания настроек, которые замедляют сайт в бою."""
+    return [
+        problem for problem in (check() for check in CHECKS) if problem
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет, не осталось ли включённых настроек, которые мешают '
+        'скорости в бою: отладка, шаблоны без кэша, соединение с базой '
+        'на каждый запрос, кэш в памяти процесса и т. п. Завершается с '
+        'ошибкой, если такие нашлись.'
+    )
+
+    def handle(self, *args, **options):
+        problems = find_problems()
+        for problem in problems:
+            self.stdout.write(f'- {problem}')
+        if problems:
+            raise CommandError(f'Найдено проблем: {len(problems)}')
+        self.stdout.write(self.style.SUCCESS('Настройки готовы к бою'))
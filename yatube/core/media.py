@@ -0,0 +1,179 @@
+"""Отдача загруженных файлов (MEDIA_ROOT) в бою.
+
+Режим задаёт MEDIA_SERVING:
+off — файлы по MEDIA_URL отдаёт прокси, приложение их не трогает;
+x-accel — приложение проверяет путь, а файл отдаёт nginx по внутреннему
+адресу MEDIA_ACCEL_PREFIX (X-Accel-Redirect);
+x-sendfile — то же для Apache и lighttpd по абсолютному пути (X-Sendfile);
+app — файл отдаёт само приложение через FileResponse: с ETag и
+If-None-Match, запросами диапазонов (Range) и sendfile у WSGI-сервера с
+wsgi.file_wrapper.
+
+Файлы под MEDIA_IMMUTABLE_PREFIXES (размеры картинок, миниатюры) не
+меняются под своим именем и кэшируются на год, остальные — на сутки.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from stat import S_ISREG
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MAX_AGE = 60 * 60 * 24
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Часть открытого файла от start длиной length.
+
+    read() не заходит за конец части. fileno() позволяет WSGI-серверу
+    отправить её sendfile с текущей позиции: длину ограничивает
+    Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(start, end) единственного диапазона, None — отдать файл целиком.
+
+    Несколько диапазонов сразу не поддерживаются: на такой запрос, как
+    разрешает RFC 7233, уходит весь файл. ValueError — диапазон за
+    пределами файла.
+    """
+    match = _RANGE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # bytes=-N — последние N байт.
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def file_etag(stat):
+    # Размер и время изменения вместо хэша содержимого: файл не читается.
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def is_immutable(name):
+    return name.startswith(tuple(settings.MEDIA_IMMUTABLE_PREFIXES))
+
+
+def range_applies(request, etag, stat):
+    """If-Range: диапазон действует, только если файл не менялся."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(stat.st_mtime)
+
+
+def file_response(request, path, stat, etag):
+    content_type, encoding = mimetypes.guess_type(path)
+    file = open(path, 'rb')
+    header = request.META.get('HTTP_RANGE', '')
+    try:
+        byte_range = (
+            parse_range(header, stat.st_size)
+            if header and range_applies(request, etag, stat) else None
+        )
+    except ValueError:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1))
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = end - start + 1
+    # Архивы (.gz и т. п.) уходят как есть, без Content-Encoding: иначе
+    # браузер распаковал бы их сам.
+    if encoding or not content_type:
+        content_type = 'application/octet-stream'
+    response['Content-Type'] = content_type
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def offload_response(name, path):
+    """Пустой ответ, файл по которому отдаст прокси."""
+    response = HttpResponse()
+    if settings.MEDIA_SERVING == 'x-accel':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(name)
+        )
+    else:
+        response['X-Sendfile'] = path
+    # Прокси подставит тип сам, если его не задать.
+    del response['Content-Type']
+    return response
+
+
+def serve(request, path):
+    name = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not S_ISREG(stat.st_mode):
+        raise Http404
+    etag = file_etag(stat)
+    if settings.MEDIA_SERVING in ('x-accel', 'x-sendfile'):
+        # Условные запросы и диапазоны прокси обрабатывает сам.
+        response = offload_response(name, full_path)
+    else:
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(stat.st_mtime)
+        )
+        if response is None:
+            response = file_response(request, full_path, stat, etag)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    if is_immutable(name):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=MAX_AGE)
+    return response
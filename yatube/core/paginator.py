@@ -0,0 +1,66 @@
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+# Меньше этого числа строк считать точно дешевле, чем ошибаться.
+ESTIMATE_ABOVE = 10000
+# Отфильтрованную выборку считаем не дальше этого числа строк.
+COUNT_LIMIT = 100000
+
+
+def estimated_count(model, using='default'):
+    """Примерное число строк в таблице модели по статистике базы.
+
+    Возвращает None, если база статистики не знает.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+        params = [table]
+    elif vendor == 'mysql':
+        sql = (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        )
+        params = [table]
+    elif vendor == 'sqlite':
+        # Без ANALYZE статистики нет; MAX(rowid) берётся из конца
+        # B-дерева и у таблиц, куда в основном добавляют, близок к числу
+        # строк.
+        sql = f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}'
+        params = []
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор для больших таблиц без полного COUNT(*).
+
+    Для всей таблицы число строк берётся из статистики базы, если их
+    больше ESTIMATE_ABOVE. Отфильтрованная выборка считается точно,
+    но не дальше COUNT_LIMIT строк: дальних страниц в списке не будет.
+    """
+
+    estimate_above = ESTIMATE_ABOVE
+    count_limit = COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = queryset.query
+        if not query.where and not query.distinct and not query.combinator:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.estimate_above:
+                return estimate
+        return queryset.order_by()[:self.count_limit].count()
@@ -0,0 +1,107 @@
+"""Чтение с реплик базы с гарантией «вижу свои записи».
+
+Чтения идут на реплики (DATABASE_REPLICAS) только внутри GET- и
+HEAD-запросов. Записи и чтения вне запросов (команды, фоновые потоки,
+транзакции) остаются на основной базе. Кто только что писал — POST,
+подписка, любая запись через ORM, — получает куку и ещё
+REPLICA_PIN_SECONDS читает с основной базы: реплика могла не успеть
+догнать. Реплика, к которой не удалось подключиться, на
+REPLICA_RETRY_SECONDS выпадает из выбора; если живых реплик нет,
+чтение идёт на основную базу. primary_reads() отправляет на основную
+базу чтения одного блока кода.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+_down_until = {}
+
+
+def replica_available(alias):
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _down_until[alias] = (
+            time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        )
+        return False
+    _down_until.pop(alias, None)
+    return True
+
+
+def choose_replica():
+    """Живая реплика или None, если читать надо с основной базы."""
+    if not getattr(_state, 'use_replicas', False) or _state.wrote:
+        return None
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if replica_available(alias):
+            return alias
+    return None
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут на основную базу."""
+    previous = getattr(_state, 'use_replicas', False)
+    _state.use_replicas = False
+    try:
+        yield
+    finally:
+        _state.use_replicas = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты у них общие.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.use_replicas = (
+            request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+        )
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.use_replicas = False
+            _state.wrote = False
+        if wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
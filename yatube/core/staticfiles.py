@@ -0,0 +1,141 @@
+"""Статика с хэшем в именах и заранее сжатыми копиями.
+
+CompressedManifestStaticFilesStorage после collectstatic кладёт рядом с
+каждым файлом с хэшем в имени его копии .gz и, если установлен модуль
+brotli, .br. serve отдаёт статику из STATIC_ROOT самим приложением,
+когда перед ним нет прокси (SERVE_STATIC): выбирает сжатую копию по
+Accept-Encoding, файлам с хэшем ставит кэш на год, а сам файл уходит
+через FileResponse — WSGI-сервер с wsgi.file_wrapper отправляет его
+sendfile без копирования в память процесса.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.txt', '.html', '.json', '.xml',
+    '.ico', '.ttf', '.otf', '.eot',
+)
+# Меньшие файлы сжатие почти не уменьшает.
+MIN_SIZE = 256
+# Кодировки в порядке предпочтения и расширения их копий.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# name.0123456789ab.css -> name.css, как делает ManifestStaticFilesStorage.
+_HASH = re.compile(r'\.[0-9a-f]{12}(?=\.[^./]+$|$)')
+
+
+def gzip_compress(content):
+    # gzip.compress() принимает mtime только с Python 3.8. Нулевое время
+    # в заголовке делает копию одинаковой при каждом collectstatic.
+    buffer = BytesIO()
+    with gzip.GzipFile(
+        fileobj=buffer, mode='wb', compresslevel=9, mtime=0
+    ) as file:
+        file.write(content)
+    return buffer.getvalue()
+
+
+def compressed_variants(content):
+    """Сжатые копии содержимого, которые короче оригинала."""
+    variants = {'.gz': gzip_compress(content)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content)
+    return {
+        suffix: data for suffix, data in variants.items()
+        if len(data) < len(content)
+    }
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хэш в именах файлов плюс копии .gz и .br для текстовых файлов."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < MIN_SIZE:
+            return
+        for suffix, data in compressed_variants(content).items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(data))
+
+
+def is_hashed(name):
+    """Имя с хэшем содержимого: такой файл никогда не меняется."""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    original = _HASH.sub('', name, count=1)
+    return original != name and hashed_files.get(original) == name
+
+
+def choose_variant(request, path):
+    """Кодировка и путь лучшей копии, которую принимает клиент."""
+    accepted = {
+        value.split(';')[0].strip()
+        for value in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+    }
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return encoding, path + suffix
+    return None, path
+
+
+def serve(request, path):
+    name = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path) or name.endswith(('.gz', '.br')):
+        raise Http404
+    stat = os.stat(full_path)
+    if not was_modified_since(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime,
+        stat.st_size,
+    ):
+        return HttpResponseNotModified()
+    content_type, _ = mimetypes.guess_type(full_path)
+    encoding, variant = choose_variant(request, full_path)
+    response = FileResponse(open(variant, 'rb'))
+    # FileResponse угадал бы тип по имени копии (.gz — архив), а нужен тип
+    # исходного файла.
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if name.endswith(COMPRESSIBLE):
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if is_hashed(name):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
@@ -1,4 +1,32 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.signals import request_started
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.http import Http404
+from django.template import Context, Template
+from django.test import (RequestFactory, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+from . import diagnostics, instrumentation, replicas, staticfiles
+from .cache import STAMP_KEY, TwoTierCache
+from .paginator import EstimatedCountPaginator, estimated_count
+
+TEMP_CACHE_DIR = tempfile.mkdtemp()
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +34,673 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    'two-tier-test': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': TEMP_CACHE_DIR,
+    },
+})
+class TwoTierCacheTests(TestCase):
+    """Два экземпляра с разными LOCATION изображают два воркера."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def make_worker(self, name, max_entries=10, **options):
+        worker = TwoTierCache(name, {
+            'OPTIONS': {
+                'SHARED': 'two-tier-test',
+                'LOCAL_MAX_ENTRIES': max_entries,
+                **options,
+            },
+        })
+        worker.clear()
+        return worker
+
+    def start_request(self):
+        request_started.send(sender=self.__class__)
+
+    def setUp(self):
+        self.worker_a = self.make_worker('worker-a')
+        self.worker_b = self.make_worker('worker-b')
+        self.worker_a.clear()
+        self.worker_b.clear()
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение не обращается к общему уровню."""
+        self.worker_a.set('key', 'value')
+        self.worker_a.shared.delete('key')
+        self.assertEqual(self.worker_a.get('key'), 'value')
+
+    def test_write_in_other_worker_drops_local_copy(self):
+        """После записи другим воркером локальная копия сбрасывается."""
+        self.worker_a.set('key', 'old')
+        self.assertEqual(self.worker_b.get('key'), 'old')
+        self.worker_a.set('key', 'new')
+        self.start_request()
+        self.assertEqual(self.worker_b.get('key'), 'new')
+
+    def test_incr_is_visible_to_other_worker(self):
+        """Счётчик поколения, сдвинутый в одном воркере, виден в другом."""
+        self.worker_a.set('generation', 1)
+        self.assertEqual(self.worker_b.get('generation'), 1)
+        self.worker_a.incr('generation')
+        self.start_request()
+        self.assertEqual(self.worker_b.get('generation'), 2)
+
+    def test_add_does_not_flush_other_workers(self):
+        """add() нового ключа не сбрасывает локальные уровни."""
+        self.worker_a.set('key', 'value')
+        self.worker_b.get('key')
+        self.worker_a.add('other', 'value')
+        self.worker_a.shared.delete('key')
+        self.start_request()
+        self.assertEqual(self.worker_b.get('key'), 'value')
+
+    def test_immutable_writes_do_not_flush_other_workers(self):
+        """Запись неизменяемого ключа не сбрасывает чужие локальные копии."""
+        options = {
+            'LOCAL_MUTABLE_PREFIXES': ['generation:'],
+            'LOCAL_IMMUTABLE_PREFIXES': ['page:'],
+        }
+        worker_a = self.make_worker('worker-c', **options)
+        worker_b = self.make_worker('worker-d', **options)
+        worker_a.set('generation:feed', 1)
+        worker_a.set('page:1', 'страница')
+        self.assertEqual(worker_b.get('generation:feed'), 1)
+        self.assertEqual(worker_b.get('page:1'), 'страница')
+        worker_a.shared.delete('generation:feed')
+        worker_a.shared.delete('page:1')
+        stamp = worker_a.shared.get(STAMP_KEY)
+        worker_a.set('page:2', 'другая')
+        worker_a.set('session', 'данные')
+        self.assertEqual(worker_a.shared.get(STAMP_KEY), stamp)
+        self.start_request()
+        self.assertEqual(worker_b.get('generation:feed'), 1)
+        # Изменяемый ключ сбрасывает только изменяемые копии.
+        worker_a.set('generation:feed', 2)
+        self.start_request()
+        self.assertEqual(worker_b.get('generation:feed'), 2)
+        self.assertEqual(worker_b.get('page:1'), 'страница')
+
+    def test_other_keys_skip_local_tier(self):
+        """Ключи без префикса из опций читаются прямо из общего кэша."""
+        worker = self.make_worker(
+            'worker-e', LOCAL_MUTABLE_PREFIXES=['generation:']
+        )
+        worker.set('session', 'old')
+        worker.shared.set('session', 'new')
+        self.assertEqual(worker.get('session'), 'new')
+        self.assertEqual(len(worker._tier.entries), 0)
+
+    def test_local_tier_is_lru_bounded(self):
+        """Локальный уровень хранит не больше LOCAL_MAX_ENTRIES ключей."""
+        worker = self.make_worker('worker-small', max_entries=2)
+        worker.clear()
+        for key in ('a', 'b', 'c'):
+            worker.add(key, key)
+        self.assertEqual(len(worker._tier.entries), 2)
+        self.assertEqual(worker.get('a'), 'a')
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'group-{i}', description='-')
+            for i in range(5)
+        )
+
+    def test_whole_table_count_is_estimated(self):
+        paginator = EstimatedCountPaginator(Group.objects.all(), 2)
+        paginator.estimate_above = 0
+        with self.assertNumQueries(1):
+            count = paginator.count
+        self.assertEqual(count, estimated_count(Group))
+        self.assertGreaterEqual(count, 5)
+
+    def test_filtered_count_is_capped(self):
+        paginator = EstimatedCountPaginator(
+            Group.objects.exclude(slug='group-0'), 2
+        )
+        paginator.count_limit = 3
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+
+class BenchmarkUrlsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        Post.objects.create(author=author, group=group, text='Пост')
+        Follow.objects.create(user=reader, author=author)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.output = os.path.join(directory, 'benchmark.json')
+
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command(
+            'benchmark_urls', '--requests', '2', '--warmup', '0',
+            '--output', self.output, *args, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_report(self):
+        self.benchmark()
+        with open(self.output) as file:
+            report = json.load(file)
+        results = report['results']
+        for key in (
+            'posts:index [anonymous]',
+            'posts:follow_index [authenticated]',
+            'users:login [anonymous]',
+            'about:tech [authenticated]',
+        ):
+            self.assertIn(key, results)
+            self.assertEqual(results[key]['requests'], 2)
+            self.assertIn('p95_ms', results[key])
+        self.assertEqual(
+            results['posts:follow_index [authenticated]']['statuses'], [200]
+        )
+        self.assertEqual(report['dataset']['users'], 2)
+        self.assertEqual(report['dataset']['posts'], Post.objects.count())
+
+    def test_benchmark_leaves_data_unchanged(self):
+        self.benchmark('--only', 'posts:profile_unfollow')
+        self.assertTrue(Follow.objects.exists())
+
+    def test_compare_reports_regressions(self):
+        self.benchmark('--only', 'posts:index')
+        with open(self.output) as file:
+            report = json.load(file)
+        for result in report['results'].values():
+            result['p95_ms'] = 0
+            result['queries'] = 0
+        previous = self.output + '.old'
+        with open(previous, 'w') as file:
+            json.dump(report, file)
+        out = self.benchmark('--only', 'posts:index', '--compare', previous)
+        self.assertIn('Регрессий: 2', out)
+
+
+@override_settings(PERF_SAMPLE_RATE=1, DEBUG=True)
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset()
+        self.addCleanup(instrumentation.reset)
+
+    def test_server_timing(self):
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('total;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            self.assertIn(metric, timing)
+        self.assertNotIn('tpl;dur=0.0', timing)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(instrumentation.summaries(), [])
+
+    @override_settings(DEBUG=False)
+    def test_server_timing_for_staff_only(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.has_header('Server-Timing'))
+
+    def test_performance_page(self):
+        url = reverse('core:performance')
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {'format': 'json'})
+        rows = {row['view']: row for row in response.json()['views']}
+        self.assertEqual(rows['posts:index']['requests'], 2)
+        self.assertGreater(rows['posts:index']['queries_max'], 0)
+        self.assertGreater(rows['posts:index']['cache_misses'], 0)
+        response = self.client.get(url)
+        self.assertContains(response, 'posts:index')
+
+    def test_histogram_window(self):
+        histogram = instrumentation.RollingHistogram(window=120, slot=60)
+        measurement = instrumentation.Measurement()
+        measurement.total = 0.02
+        histogram.add(measurement, now=1000)
+        summary = histogram.summary(now=1000)
+        self.assertEqual(summary['requests'], 1)
+        self.assertGreaterEqual(summary['total_p95_ms'], 20)
+        self.assertLess(summary['total_p95_ms'], 25)
+        self.assertIsNone(histogram.summary(now=1200))
+
+
+class Probe:
+    result = None
+
+    @property
+    def origin(self):
+        self.result = diagnostics.origin()
+        return ''
+
+
+@override_settings(PERF_SAMPLE_RATE=1, QUERY_DIAGNOSTICS=True)
+class QueryDiagnosticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fingerprint_ignores_values(self):
+        first = (
+            'SELECT "id" FROM "posts_post" WHERE "id" IN (%s, %s, %s) '
+            "AND text = 'кот' LIMIT 21"
+        )
+        second = (
+            'SELECT "id"  FROM "posts_post" WHERE "id" IN (%s) '
+            "AND text = 'пёс' LIMIT 10"
+        )
+        self.assertEqual(
+            diagnostics.normalize(first),
+            'SELECT "id" FROM "posts_post" WHERE "id" IN (...) '
+            'AND text = ? LIMIT ?',
+        )
+        self.assertEqual(
+            diagnostics.fingerprint(first), diagnostics.fingerprint(second)
+        )
+
+    def test_origin(self):
+        probe = Probe()
+        Template('\n{{ probe.origin }}').render(Context({'probe': probe}))
+        code, template = probe.result
+        self.assertTrue(code.startswith('core/tests.py:'))
+        self.assertTrue(template.endswith(':2'))
+
+    def test_duplicates(self):
+        statements = [
+            ('SELECT 1 FROM t WHERE id = %s', 0.001, 'posts/views.py:1', None)
+        ] * 3 + [('SELECT 2', 0.001, None, None)]
+        with self.assertLogs('yatube.queries', 'WARNING') as logs:
+            diagnostics.report('posts:index', '/', statements)
+        self.assertEqual(len(logs.records), 1)
+        data = logs.records[0].data
+        self.assertEqual(logs.records[0].getMessage(), 'duplicate_query')
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['code'], 'posts/views.py:1')
+        line = json.loads(diagnostics.JsonFormatter().format(logs.records[0]))
+        self.assertEqual(line['event'], 'duplicate_query')
+        self.assertEqual(line['view'], 'posts:index')
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_queries_from_request(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with self.assertLogs('yatube.queries', 'WARNING') as logs:
+            self.client.get(url)
+        slow = [
+            record.data for record in logs.records
+            if record.getMessage() == 'slow_query'
+        ]
+        self.assertTrue(slow)
+        self.assertEqual({data['view'] for data in slow}, {
+            'posts:post_detail'
+        })
+        self.assertTrue(any(
+            (data['code'] or '').startswith('posts/') for data in slow
+        ))
+
+    @override_settings(QUERY_DIAGNOSTICS=False, SLOW_QUERY_MS=0)
+    def test_disabled(self):
+        with mock.patch.object(diagnostics, 'report') as report:
+            self.client.get(reverse('posts:index'))
+        report.assert_not_called()
+
+
+class DatabaseBackendTests(TestCase):
+    def test_sqlite_pragmas(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        backend = load_backend('core.backends.sqlite3')
+        wrapper = backend.DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(directory, 'db.sqlite3'),
+        }, alias='pragmas')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            values = {}
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {pragma}')
+                values[pragma] = cursor.fetchone()[0]
+        self.assertEqual(values, {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000
+        })
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command(
+            'benchmark_db', '--threads', '2', '--seconds', '0.2',
+            '--rows', '100', stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('before', output)
+        self.assertIn('after', output)
+        self.assertIn('Операций в секунду', output)
+
+
+@override_settings(DATABASE_REPLICAS=['replica-test'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Реплика — копия тестовой базы в отдельном файле SQLite."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(replicas._down_until.clear)
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='Старый пост')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.replica_name = os.path.join(directory, 'replica.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(self.replica_name)
+        connection.connection.backup(target)
+        target.close()
+        self.use_replica(self.replica_name)
+        Post.objects.create(author=self.author, text='Новый пост')
+
+    def use_replica(self, name):
+        connections.databases['replica-test'] = {
+            **connection.settings_dict, 'NAME': name
+        }
+        self.addCleanup(self.drop_replica)
+
+    def drop_replica(self):
+        if 'replica-test' in connections.databases:
+            connections['replica-test'].close()
+            del connections['replica-test']
+            del connections.databases['replica-test']
+
+    # С REPLICA_PIN_SECONDS=0 окно отставания реплики после последней
+    # записи уже прошло.
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_reads_go_to_replica(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Старый пост')
+        self.assertNotContains(response, 'Новый пост')
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_fresh_write_skips_lagging_replica(self):
+        # Реплика не видит поста, который только что сдвинул поколение
+        # ленты, а страница уйдёт в кэш под этим поколением.
+        for _ in range(2):
+            response = self.client.get(reverse('posts:index'))
+            self.assertContains(response, 'Новый пост')
+        response = self.client.get(
+            reverse('posts:index'), HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_api_follows_page_policy(self):
+        url = reverse('api:posts')
+        texts = [item['text'] for item in self.client.get(url).json()[
+            'results'
+        ]]
+        self.assertIn('Новый пост', texts)
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            texts = [item['text'] for item in self.client.get(url).json()[
+                'results'
+            ]]
+        self.assertEqual(texts, ['Старый пост'])
+
+    def test_writer_reads_own_writes(self):
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Только что'}
+        )
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertContains(response, 'Только что')
+        self.assertContains(response, 'Новый пост')
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_unavailable_replica(self):
+        self.drop_replica()
+        self.use_replica(os.path.join(self.replica_name, 'missing', 'db'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый пост')
+        self.assertIn('replica-test', replicas._down_until)
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(Post.objects.count(), 2)
+
+
+TEMPLATES = settings.TEMPLATES[0]
+UNCACHED_TEMPLATES = [{
+    **TEMPLATES,
+    'OPTIONS': {**TEMPLATES['OPTIONS'], 'debug': False},
+}]
+PROD_TEMPLATES = [{
+    **TEMPLATES,
+    'OPTIONS': {
+        **TEMPLATES['OPTIONS'],
+        'debug': False,
+        'loaders': [(
+            'django.template.loaders.cached.Loader',
+            TEMPLATES['OPTIONS']['loaders'],
+        )],
+    },
+}]
+
+
+@override_settings(
+    DEBUG=False,
+    TEMPLATES=PROD_TEMPLATES,
+    CACHES={
+        'default': {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'OPTIONS': {'SHARED': 'shared'},
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': TEMP_CACHE_DIR,
+        },
+    },
+    STATICFILES_STORAGE=(
+        'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+    ),
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    PERF_SAMPLE_RATE=0.01,
+    THUMBNAIL_WORKERS=2,
+)
+class CheckPerformanceTests(TestCase):
+    def check(self):
+        out = StringIO()
+        call_command('check_performance', stdout=out)
+        return out.getvalue()
+
+    def test_prod_settings_pass(self):
+        self.assertIn('Настройки готовы к бою', self.check())
+
+    def test_reports_hostile_settings(self):
+        hostile = {
+            'DEBUG': True,
+            'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+            'THUMBNAIL_WORKERS': 0,
+            'TEMPLATES': UNCACHED_TEMPLATES,
+        }
+        for name, value in hostile.items():
+            with self.subTest(setting=name), override_settings(
+                **{name: value}
+            ):
+                with self.assertRaisesMessage(
+                    CommandError, 'Найдено проблем: 1'
+                ):
+                    self.check()
+
+    @override_settings(STATICFILES_STORAGE=(
+        'core.staticfiles.CompressedManifestStaticFilesStorage'
+    ))
+    def test_reports_missing_brotli(self):
+        with mock.patch.object(staticfiles, 'brotli', None):
+            with self.assertRaisesMessage(CommandError, 'Найдено проблем: 1'):
+                self.check()
+
+
+class StaticFilesTests(TestCase):
+    CSS = b'body { color: black; }\n' * 100
+
+    def setUp(self):
+        source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        for directory in (source, self.root):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'wb') as file:
+            file.write(self.CSS)
+        settings_override = override_settings(
+            STATICFILES_DIRS=[source],
+            STATIC_ROOT=self.root,
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ],
+            STATICFILES_STORAGE=(
+                'core.staticfiles.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.name = staticfiles.staticfiles_storage.stored_name(
+            'css/site.css'
+        )
+        self.factory = RequestFactory()
+
+    def test_collectstatic_writes_hashed_compressed_copies(self):
+        self.assertNotEqual(self.name, 'css/site.css')
+        with open(os.path.join(self.root, self.name + '.gz'), 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()), self.CSS)
+
+    def test_serves_compressed_variant_forever(self):
+        request = self.factory.get(
+            f'/static/{self.name}', HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        response = staticfiles.serve(request, self.name)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), self.CSS)
+
+    def test_plain_and_unhashed_files(self):
+        request = self.factory.get('/static/css/site.css')
+        response = staticfiles.serve(request, 'css/site.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content), self.CSS)
+        for name in ('../settings.py', f'{self.name}.gz', 'missing.css'):
+            with self.subTest(name=name), self.assertRaises(Http404):
+                staticfiles.serve(self.factory.get('/static/x'), name)
+
+
+class MediaServingTests(TestCase):
+    CONTENT = b'0123456789'
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        for name in ('posts/photo.jpg', 'posts/renditions/photo/320.jpg'):
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(self.CONTENT)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.root, MEDIA_SERVING='app'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = '/media/posts/photo.jpg'
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file_and_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(self.body(response), self.CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_renditions_are_cached_forever(self):
+        response = self.client.get('/media/posts/renditions/photo/320.jpg')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_ranges(self):
+        cases = {
+            'bytes=2-5': (b'2345', 'bytes 2-5/10'),
+            'bytes=7-': (b'789', 'bytes 7-9/10'),
+            'bytes=-3': (b'789', 'bytes 7-9/10'),
+            'bytes=8-100': (b'89', 'bytes 8-9/10'),
+        }
+        for header, (body, content_range) in cases.items():
+            with self.subTest(range=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'], str(len(body)))
+                self.assertEqual(self.body(response), body)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+        # Файл изменился с тех пор, как клиент получил начало: весь файл.
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"old"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.CONTENT)
+
+    def test_offload_to_proxy(self):
+        with override_settings(MEDIA_SERVING='x-accel'):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts/photo.jpg'
+        )
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_SERVING='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(self.root, 'posts', 'photo.jpg'),
+        )
+
+    def test_missing_and_outside_files(self):
+        for url in ('/media/posts/none.jpg', '/media/posts', '/media/../x'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
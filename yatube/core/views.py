@@ -1,7 +1,12 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import instrumentation
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html',
@@ -19,3 +24,19 @@ def permission_denied(request, exception):
     return render(request, 'core/403.html',
                   {'path': request.path},
                   status=HTTPStatus.FORBIDDEN)
+
+
+@staff_member_required
+def performance(request):
+    rows = instrumentation.summaries()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'sample_rate': settings.PERF_SAMPLE_RATE,
+            'window': instrumentation.WINDOW,
+            'views': rows,
+        })
+    return render(request, 'core/performance.html', {
+        'rows': rows,
+        'sample_rate': settings.PERF_SAMPLE_RATE,
+        'window': instrumentation.WINDOW // 60,
+    })
@@ -1,6 +1,63 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
 
+from core.paginator import EstimatedCountPaginator
+
+from . import caching
 from .models import Comment, Follow, Group, Post
+from .search import search_posts
+
+
+class PostActionForm(ActionForm):
+    # Автодополнение вместо <select> со всеми группами на каждой странице.
+    # Форма общая для всех действий, поэтому группа обязательна только
+    # в move_to_group.
+    group = forms.ModelChoiceField(
+        label='Группа',
+        queryset=Group.objects.only('title'),
+        required=False,
+        widget=AutocompleteSelect(
+            Post._meta.get_field('group').remote_field, admin.site
+        ),
+    )
+
+
+class RowAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которое берёт выбранный объект из строки списка.
+
+    Обычный виджет ищет выбранное значение отдельным запросом, и в
+    списке с list_editable это запрос на каждую строку.
+    """
+
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        if self.selected is None:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        for obj in self.selected:
+            if str(obj.pk) in value:
+                options.append(self.create_option(
+                    name, obj.pk, self.choices.field.label_from_instance(obj),
+                    True, len(options),
+                ))
+        return [(None, options, 0)]
+
+
+class PostChangeListForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        widget = self.fields['group'].widget
+        widget = getattr(widget, 'widget', widget)
+        if isinstance(widget, RowAutocompleteSelect):
+            # Группа строки уже пришла через list_select_related.
+            group = self.instance.group if self.instance.group_id else None
+            widget.selected = [group] if group else []
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -12,12 +69,75 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_form = PostActionForm
+    actions = ('move_to_group',)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = RowAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице — поисковый индекс постов.
+        if not search_term.strip():
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
+    def move_to_group(self, request, queryset):
+        if not request.POST.get('group'):
+            self.message_user(request, 'Выберите группу', messages.ERROR)
+            return
+        try:
+            group = PostActionForm.base_fields['group'].clean(
+                request.POST.get('group')
+            )
+        except ValidationError:
+            self.message_user(request, 'Нет такой группы', messages.ERROR)
+            return
+        post_ids, author_ids, group_ids = set(), set(), {group.pk}
+        for post_id, author_id, group_id in queryset.order_by().values_list(
+            'pk', 'author_id', 'group_id'
+        ):
+            post_ids.add(post_id)
+            author_ids.add(author_id)
+            group_ids.add(group_id)
+        # Один UPDATE вместо save() на каждую строку; сигналы при этом
+        # не срабатывают, поэтому кэш страниц сбрасывается здесь же.
+        updated = queryset.update(group=group)
+        caching.forget_posts(*post_ids)
+        caching.bump(
+            (caching.FEED,),
+            *((caching.GROUP, group_id) for group_id in group_ids - {None}),
+            *((caching.AUTHOR, author_id) for author_id in author_ids),
+            *((caching.POST, post_id) for post_id in post_ids),
+        )
+        self.message_user(
+            request, f'Перенесено постов: {updated}', messages.SUCCESS
+        )
+
+    move_to_group.short_description = 'Перенести в выбранную группу'
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('title', 'slug')
+    search_fields = ('title', 'slug')
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment)
 admin.site.register(Follow)
@@ -0,0 +1,280 @@
+import hashlib
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from core.replicas import primary_reads
+
+from .models import Group, Post, User
+
+CACHE_TIMEOUT = 60 * 60 * 6
+
+FEED = 'feed'
+GROUP = 'group'
+AUTHOR = 'author'
+POST = 'post'
+
+
+def generation_key(scope, name=''):
+    return f'generation:{scope}:{name}'
+
+
+def fresh_generation():
+    # Счётчик, вытесненный из кэша, не должен вернуться к старому
+    # значению, иначе ожили бы страницы со старым содержимым.
+    return time.time_ns() // 1000
+
+
+def get_generations(keys):
+    """Текущие поколения для ключей; отсутствующие заводятся заново."""
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, fresh_generation(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def modified_key(scope, name=''):
+    return f'modified:{scope}:{name}'
+
+
+def bump(*scopes):
+    """Инвалидирует все страницы, построенные на данных scopes."""
+    for scope in scopes:
+        key = generation_key(*scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, fresh_generation(), None)
+    if scopes:
+        now = time.time()
+        cache.set_many({modified_key(*scope): now for scope in scopes}, None)
+
+
+def last_modified(scopes):
+    """Время последней записи в scopes или None, если оно неизвестно."""
+    keys = [modified_key(*scope) for scope in scopes]
+    stamps = cache.get_many(keys)
+    if len(stamps) < len(keys):
+        return None
+    return datetime.fromtimestamp(max(stamps.values()), timezone.utc)
+
+
+def replicas_caught_up(scopes):
+    """Прошло ли с последней записи в scopes больше REPLICA_PIN_SECONDS.
+
+    Столько же читает с основной базы тот, кто сам только что писал:
+    дольше реплика не отстаёт. Запись, время которой неизвестно (ключ
+    вытеснен из кэша), считается сделанной сейчас.
+    """
+    keys = [modified_key(*scope) for scope in scopes]
+    stamps = cache.get_many(keys)
+    now = time.time()
+    for key in keys:
+        if key not in stamps:
+            cache.add(key, now, None)
+            stamps[key] = now
+    return now - max(stamps.values(), default=0) > (
+        settings.REPLICA_PIN_SECONDS
+    )
+
+
+@contextmanager
+def scope_reads(scopes):
+    """Чтения для ответа, который уйдёт в кэш или получит ETag.
+
+    Ключ и ETag строятся из поколений, а поколение сдвигается сразу при
+    записи. Пока реплика может не видеть последнюю запись в scopes,
+    ответ читает основную базу, иначе старое содержимое закрепилось бы
+    под новым поколением. Потом чтения снова идут на реплики.
+    """
+    if not settings.DATABASE_REPLICAS or replicas_caught_up(scopes):
+        yield
+        return
+    with primary_reads():
+        yield
+
+
+def page_etag(request, scopes, extra=()):
+    """Валидатор ответа: поколения scopes, адрес, пользователь и extra."""
+    generations = get_generations(
+        [generation_key(*scope) for scope in scopes]
+    )
+    raw = ':'.join([
+        *map(str, generations), request.get_full_path(),
+        str(request.user.pk), *extra,
+    ])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def csrf_cookie(request):
+    """CSRF-токен, который попадёт в формы ответа; заводит его, если нет."""
+    get_token(request)
+    return request.META['CSRF_COOKIE']
+
+
+def lookup(key, query):
+    """Значение из кэша или, при промахе, из query().
+
+    Так views узнают id по адресу, не трогая базу. Сигналы удаляют ключ
+    при изменении данных; срок CACHE_TIMEOUT — на случай записи в обход
+    них. Промах читает основную базу: отставшая реплика вернула бы
+    значение до той самой записи, что удалила ключ.
+    """
+    value = cache.get(key)
+    if value is None:
+        with primary_reads():
+            value = query()
+        if value is not None:
+            cache.set(key, value, CACHE_TIMEOUT)
+    return value
+
+
+def post_lookup_key(post_id):
+    return f'post-scopes:{post_id}'
+
+
+def group_lookup_key(slug):
+    return f'group-id:{slug}'
+
+
+def user_lookup_key(username):
+    return f'user-id:{username}'
+
+
+def forget_posts(*post_ids):
+    cache.delete_many([post_lookup_key(pk) for pk in post_ids])
+
+
+def forget_group(slug):
+    cache.delete(group_lookup_key(slug))
+
+
+def forget_user(username):
+    cache.delete(user_lookup_key(username))
+
+
+def feed_scopes():
+    return [(FEED,)]
+
+
+def group_scopes(slug):
+    group_id = lookup(
+        group_lookup_key(slug),
+        Group.objects.filter(slug=slug).values_list('pk', flat=True).first,
+    )
+    return [(GROUP, group_id or '')]
+
+
+def profile_scopes(username):
+    user_id = lookup(
+        user_lookup_key(username),
+        User.objects.filter(username=username).values_list(
+            'pk', flat=True
+        ).first,
+    )
+    return [(AUTHOR, user_id or '')]
+
+
+def post_scopes(post_id):
+    """Сам пост, его автор и группа: имена обоих есть на странице."""
+    found = lookup(
+        post_lookup_key(post_id),
+        Post.objects.filter(pk=post_id).values_list(
+            'author_id', 'group_id'
+        ).first,
+    )
+    if found is None:
+        return [(POST, post_id)]
+    author_id, group_id = found
+    scopes = [(POST, post_id), (AUTHOR, author_id)]
+    if group_id is not None:
+        scopes.append((GROUP, group_id))
+    return scopes
+
+
+def page_key(view_name, generations, path):
+    raw = ':'.join([view_name, *map(str, generations), path])
+    return 'page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cache_for_anonymous(scopes):
+    """Кэширует ответ view целиком для анонимных пользователей.
+
+    Ключ включает поколения данных, от которых зависит страница:
+    запись в них сдвигает поколение, и старые ответы больше не находятся.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            keys = [generation_key(*scope) for scope in scopes(**kwargs)]
+            key = page_key(
+                view.__name__, get_generations(keys), request.get_full_path()
+            )
+            response = cache.get(key)
+            if response is None:
+                with scope_reads(scopes(**kwargs)):
+                    response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.cookies:
+                    # Ключ включает поколения и никогда не перезаписывается.
+                    cache.add(key, response, CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(scopes):
+    """Отвечает 304 Not Modified, если страница не менялась.
+
+    ETag строится из тех же поколений, что и ключ кэша страниц, поэтому
+    проверка не трогает базу и не рисует шаблон. Last-Modified — время
+    последнего bump() этих областей; его получают только анонимы: у
+    вошедшего пользователя страница зависит ещё и от него самого.
+    Ему же страницы приходят с формами, поэтому в ETag входит и
+    CSRF-токен: после нового входа он другой, и 304 оставил бы в браузере
+    форму со старым токеном.
+    Сразу после записи страница рисуется по основной базе (scope_reads):
+    старое содержимое с ETag нового поколения браузер подтверждал бы
+    ответом 304 до следующей записи.
+    """
+    def etag(request, **kwargs):
+        if request.user.is_authenticated:
+            return page_etag(
+                request, scopes(**kwargs), [csrf_cookie(request)]
+            )
+        return page_etag(request, scopes(**kwargs))
+
+    def modified(request, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        return last_modified(scopes(**kwargs))
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with scope_reads(scopes(**kwargs)):
+                response = conditional_view(request, *args, **kwargs)
+            # Без no-cache браузер считал бы страницу свежей по
+            # Last-Modified и не спрашивал сервер вовсе.
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
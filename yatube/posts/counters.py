@@ -0,0 +1,64 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, Profile, User
+
+
+def bump(queryset, field, delta):
+    """Атомарно сдвигает счётчик одним UPDATE без чтения строки."""
+    queryset.update(**{field: F(field) + delta})
+
+
+def bump_profile(user_id, field, delta):
+    bump(Profile.objects.filter(user_id=user_id), field, delta)
+
+
+def bump_comments(post_id, delta):
+    bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def count_of(model, field, outer):
+    """Коррелированный подзапрос COUNT(*) для пересчёта счётчика."""
+    counted = model.objects.filter(**{field: OuterRef(outer)}).order_by(
+    ).values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def profile_counts():
+    return {
+        'posts_count': count_of(Post, 'author', 'user_id'),
+        'followers_count': count_of(Follow, 'author', 'user_id'),
+        'following_count': count_of(Follow, 'user', 'user_id'),
+    }
+
+
+def post_counts():
+    return {
+        'comments_count': count_of(Comment, 'post', 'pk'),
+    }
+
+
+def create_missing_profiles():
+    """Создаёт профили пользователям, у которых их нет."""
+    users = User.objects.filter(profile__isnull=True).values_list(
+        'pk', flat=True
+    )
+    profiles = [Profile(user_id=pk) for pk in users]
+    Profile.objects.bulk_create(profiles, batch_size=500)
+    return len(profiles)
+
+
+def repair(rows, counts, dry_run=False):
+    """Чинит расхождения счётчиков в выборке одним UPDATE.
+
+    counts -- фабрика выражений: profile_counts или post_counts.
+
+    Возвращает число строк, в которых счётчики разошлись с фактом.
+    """
+    drifted = rows.annotate(**{
+        f'actual_{field}': expr for field, expr in counts().items()
+    }).exclude(**{field: F(f'actual_{field}') for field in counts()})
+    total = drifted.count()
+    if total and not dry_run:
+        rows.update(**counts())
+    return total
@@ -1,6 +1,6 @@
 from django import forms
 
-from .models import Comment, Post
+from .models import Comment, Group, Post
 
 
 class PostForm(forms.ModelForm):
@@ -19,3 +19,22 @@ class CommentForm(forms.ModelForm):
         fields = (
             'text',
         )
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(
+        label='Запрос',
+        max_length=200,
+        required=False,
+    )
+    group = forms.ModelChoiceField(
+        label='Группа',
+        queryset=Group.objects.only('slug', 'title'),
+        to_field_name='slug',
+        required=False,
+    )
+    author = forms.CharField(
+        label='Автор',
+        max_length=150,
+        required=False,
+    )
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import renditions
+from posts.models import Post
+
+
+def build(post_id):
+    try:
+        renditions.build(post_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Строит адаптивные размеры картинок для постов без них.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько картинок обрабатывать параллельно.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов выбирать из базы за раз.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить размеры и у постов, где они уже есть.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(renditions='')
+        ids = posts.order_by('pk').values_list('pk', flat=True)
+        batch_size = options['batch_size']
+        built = failed = 0
+        last = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(ids.filter(pk__gt=last)[:batch_size])
+                if not batch:
+                    break
+                last = batch[-1]
+                futures = [executor.submit(build, pk) for pk in batch]
+                for post_id, future in zip(batch, futures):
+                    try:
+                        future.result()
+                    except Exception as error:
+                        failed += 1
+                        self.stderr.write(f'Пост {post_id}: {error}')
+                    else:
+                        built += 1
+        self.stdout.write(f'Построено: {built}, ошибок: {failed}')
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post, TimelineEntry
+from posts.utils import (FORWARD, NUM_OF_COMMENTS, NUM_OF_POSTS,
+                         CursorPaginator, encode_cursor)
+
+
+def feed_queries(author_id=1, group_id=1, post_id=1, user_id=1):
+    """Запросы, которыми view выбирают страницы лент.
+
+    Для каждой ленты берётся первая страница и глубокая страница
+    от курсора: обе должны идти по индексу без сортировки.
+    """
+    deep = encode_cursor(FORWARD, timezone.now(), 10 ** 9)
+    feeds = {
+        'index': CursorPaginator(Post.objects.feed(), NUM_OF_POSTS),
+        'group_posts': CursorPaginator(
+            Post.objects.filter(group_id=group_id).feed(), NUM_OF_POSTS
+        ),
+        'profile': CursorPaginator(
+            Post.objects.filter(author_id=author_id).feed(), NUM_OF_POSTS
+        ),
+        'follow_index': CursorPaginator(
+            TimelineEntry.objects.filter(user_id=user_id), NUM_OF_POSTS
+        ),
+        'post_detail': CursorPaginator(
+            Comment.objects.filter(post_id=post_id), NUM_OF_COMMENTS,
+            key='created', descending=False,
+        ),
+    }
+    for name, paginator in feeds.items():
+        yield name, paginator.window()
+        yield f'{name} (deep)', paginator.window(deep)
+    yield 'followers', Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+
+
+class Command(BaseCommand):
+    help = 'Показывает планы и время запросов лент.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз выполнить каждый запрос для замера.',
+        )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        sample = Post.objects.values('author_id', 'group_id', 'pk').first()
+        ids = {}
+        if sample:
+            ids = {
+                'author_id': sample['author_id'],
+                'group_id': sample['group_id'] or 1,
+                'post_id': sample['pk'],
+                'user_id': sample['author_id'],
+            }
+        for name, queryset in feed_queries(**ids):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+            self.stdout.write(f'{name}: {elapsed:.2f} мс')
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
@@ -0,0 +1,54 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в NDJSON/CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Папка для файлов выгрузки.')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default=transfer.NDJSON,
+        )
+        parser.add_argument(
+            '--kinds', nargs='+', choices=transfer.KINDS,
+            default=transfer.KINDS, help='Что выгружать.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Через сколько строк сбрасывать файл и контрольную точку.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: с ним прерванная выгрузка '
+                 'продолжится с места остановки.',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        fmt = options['format']
+        os.makedirs(directory, exist_ok=True)
+        checkpoint = transfer.Checkpoint(options['checkpoint'])
+        for kind in options['kinds']:
+            after = checkpoint.get(kind)
+            path = transfer.path_for(directory, kind, fmt)
+            resuming = bool(after) and os.path.exists(path)
+            if resuming and checkpoint.offset(kind) is not None:
+                # Строки после контрольной точки уже в файле, но выгрузятся
+                # заново: без обрезки они задвоились бы.
+                os.truncate(path, checkpoint.offset(kind))
+            throughput = transfer.Throughput()
+            with open(path, 'a' if resuming else 'w', newline='') as file:
+                keys = transfer.write_rows(
+                    file, fmt, kind, transfer.export_rows(kind, after),
+                    header=not resuming,
+                )
+                for batch in transfer.batched(keys, options['batch_size']):
+                    file.flush()
+                    checkpoint.save(kind, batch[-1], file.tell())
+                    throughput.add(len(batch))
+                    self.stdout.write(f'{kind}: {throughput}')
+            self.stdout.write(f'{kind}: выгружено в {path}, {throughput}')
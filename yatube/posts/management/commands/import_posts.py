@@ -0,0 +1,58 @@
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Загружает группы, посты, комментарии и подписки из NDJSON/CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Папка с файлами выгрузки.')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default=transfer.NDJSON,
+        )
+        parser.add_argument(
+            '--kinds', nargs='+', choices=transfer.KINDS,
+            default=transfer.KINDS,
+            help='Что загружать; порядок всегда как в выгрузке.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько строк вставлять одной транзакцией.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: с ним прерванная загрузка '
+                 'продолжится со следующей пачки.',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        fmt = options['format']
+        checkpoint = transfer.Checkpoint(options['checkpoint'])
+        kinds = [kind for kind in transfer.KINDS if kind in options['kinds']]
+        for kind in kinds:
+            path = transfer.path_for(directory, kind, fmt)
+            if not os.path.exists(path):
+                self.stderr.write(f'{kind}: нет файла {path}, пропускаю')
+                continue
+            done = checkpoint.get(kind)
+            throughput = transfer.Throughput()
+            with open(path, newline='') as file:
+                rows = islice(transfer.read_rows(file, fmt), done, None)
+                for batch in transfer.batched(rows, options['batch_size']):
+                    taken = transfer.import_batch(kind, batch)
+                    if taken:
+                        self.stderr.write(
+                            f'{kind}: id уже заняты, строки пропущены: '
+                            + ', '.join(map(str, taken))
+                        )
+                    done += len(batch)
+                    checkpoint.save(kind, done)
+                    throughput.add(len(batch))
+                    self.stdout.write(f'{kind}: {throughput}')
+            self.stdout.write(f'{kind}: загружено, {throughput}')
+        transfer.reset_sequences()
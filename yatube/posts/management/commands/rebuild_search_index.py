@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс по всем постам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов индексировать в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        batch_size = options['batch_size']
+        posts = Post.objects.only('text').order_by('pk')
+        started = time.monotonic()
+        indexed = 0
+        last = 0
+        backend.clear()
+        while True:
+            batch = list(posts.filter(pk__gt=last)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                backend.index_many(batch)
+            last = batch[-1].pk
+            indexed += len(batch)
+            self.stdout.write(f'Проиндексировано постов: {indexed}')
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Индекс {backend.name} построен: {indexed} постов '
+            f'за {elapsed:.1f} с'
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.models import Post, Profile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики и чинит расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк пересчитывать одним UPDATE.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать число расхождений.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        if not dry_run:
+            created = counters.create_missing_profiles()
+            self.stdout.write(f'Создано профилей: {created}')
+        targets = (
+            (Profile.objects.all(), 'user_id', counters.profile_counts),
+            (Post.objects.all(), 'pk', counters.post_counts),
+        )
+        for rows, key, counts in targets:
+            drifted = 0
+            for lower, upper in self.ranges(rows, key, batch_size):
+                batch = rows.filter(**{f'{key}__gte': lower})
+                if upper is not None:
+                    batch = batch.filter(**{f'{key}__lt': upper})
+                drifted += counters.repair(batch, counts, dry_run)
+            name = rows.model._meta.verbose_name_plural
+            self.stdout.write(f'{name}: расхождений {drifted}')
+
+    @staticmethod
+    def ranges(rows, key, batch_size):
+        """Делит таблицу на диапазоны ключа, не загружая её в память."""
+        keys = rows.order_by(key).values_list(key, flat=True)
+        lower = keys.first()
+        while lower is not None:
+            upper = keys.filter(**{f'{key}__gte': lower})[
+                batch_size:batch_size + 1
+            ].first()
+            yield lower, upper
+            lower = upper
@@ -0,0 +1,189 @@
+import random
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import transfer
+from posts.models import Comment, Post, Profile, User
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса закона Ципфа: первый элемент самый популярный."""
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.',
+        )
+        parser.add_argument(
+            '--images', type=int, default=10,
+            help='Сколько разных картинок сгенерировать.',
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.2,
+            help='Доля постов с картинкой.',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель степенного закона для авторов и подписок.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f'seed{options["seed"]}'
+        usernames = self.create_users(options['users'])
+        slugs = self.load('groups', self.group_rows(options['groups']))
+        authors = zipf_weights(len(usernames), options['skew'])
+        self.load('follows', self.follow_rows(
+            usernames, authors, options['follows']
+        ))
+        images = self.create_images(options['images'])
+        post_ids = self.load('posts', self.post_rows(
+            options['posts'], usernames, authors, slugs, images,
+            options['image_share'], options['days'],
+        ))
+        self.load('comments', self.comment_rows(
+            options['comments'], post_ids, usernames, options['skew'],
+        ))
+
+    def load(self, kind, rows):
+        """Грузит строки через импорт пачками; возвращает ключи строк."""
+        throughput = transfer.Throughput()
+        keys = []
+        key = {'groups': 'slug', 'posts': 'id'}.get(kind)
+        for batch in transfer.batched(rows, self.batch_size):
+            transfer.import_batch(kind, batch)
+            if key:
+                keys.extend(row[key] for row in batch)
+            throughput.add(len(batch))
+        self.stdout.write(f'{kind}: {throughput}')
+        return keys
+
+    def create_users(self, count):
+        throughput = transfer.Throughput()
+        usernames = [f'{self.prefix}-user{i}' for i in range(count)]
+        for batch in transfer.batched(usernames, self.batch_size):
+            User.objects.bulk_create(
+                (
+                    User(
+                        username=name,
+                        first_name=self.fake.first_name(),
+                        last_name=self.fake.last_name(),
+                    )
+                    for name in batch
+                ),
+                ignore_conflicts=True,
+            )
+            throughput.add(len(batch))
+        Profile.objects.bulk_create(
+            (
+                Profile(user_id=pk)
+                for pk in User.objects.filter(
+                    username__in=usernames, profile__isnull=True
+                ).values_list('pk', flat=True).iterator()
+            ),
+            batch_size=self.batch_size,
+        )
+        self.stdout.write(f'users: {throughput}')
+        return usernames
+
+    def group_rows(self, count):
+        for i in range(count):
+            yield {
+                'slug': f'{self.prefix}-group{i}',
+                'title': self.fake.catch_phrase()[:200],
+                'description': self.fake.paragraph(),
+            }
+
+    def follow_rows(self, usernames, authors, average):
+        for name in usernames:
+            count = min(
+                int(self.random.expovariate(1 / average)) + 1,
+                len(usernames) - 1,
+            )
+            followed = set(self.random.choices(
+                usernames, cum_weights=authors, k=count
+            )) - {name}
+            for author in followed:
+                yield {'user': name, 'author': author}
+
+    def create_images(self, count):
+        names = []
+        for i in range(count):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            image = Image.new('RGB', (1200, 800), color)
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=80)
+            name = f'posts/{self.prefix}-{i}.jpg'
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            names.append(name)
+        return names
+
+    def post_rows(self, count, usernames, authors, slugs, images,
+                  image_share, days):
+        first_id = (Post.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        now = timezone.now()
+        for pk in range(first_id, first_id + count):
+            has_group = slugs and self.random.random() < 0.7
+            has_image = images and self.random.random() < image_share
+            yield {
+                'id': pk,
+                'text': self.fake.paragraph(
+                    nb_sentences=self.random.randint(1, 12)
+                ),
+                'pub_date': (now - timedelta(
+                    seconds=self.random.randrange(days * 24 * 3600)
+                )).isoformat(),
+                'author': self.random.choices(
+                    usernames, cum_weights=authors
+                )[0],
+                'group': self.random.choice(slugs) if has_group else None,
+                'image': self.random.choice(images) if has_image else '',
+            }
+
+    def comment_rows(self, count, post_ids, usernames, skew):
+        if not post_ids:
+            return
+        first_id = (
+            Comment.objects.aggregate(last=Max('pk'))['last'] or 0
+        ) + 1
+        # Обсуждают в основном немногие посты: те же веса Ципфа.
+        popular = zipf_weights(len(post_ids), skew)
+        now = timezone.now()
+        for pk in range(first_id, first_id + count):
+            yield {
+                'id': pk,
+                'post': self.random.choices(post_ids, cum_weights=popular)[0],
+                'author': self.random.choice(usernames),
+                'text': self.fake.sentence(),
+                'created': (now - timedelta(
+                    seconds=self.random.randrange(30 * 24 * 3600)
+                )).isoformat(),
+            }
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'posts_search'
+
+
+def create_fts(apps, schema_editor):
+    # Индекс FTS5 есть только у SQLite, и то не в каждой сборке; без него
+    # поиск работает по таблице posts_searchterm.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"body, tokenize='unicode61')"
+        )
+    except OperationalError:
+        pass
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, verbose_name='Основа слова')),
+                ('weight', models.PositiveIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Термин поиска',
+                'verbose_name_plural': 'Термины поиска',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
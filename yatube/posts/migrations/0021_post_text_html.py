@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:40
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 300
+BATCH_SIZE = 500
+
+
+def render_texts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.only('text').order_by('pk')
+    batch = []
+    for post in posts.iterator(chunk_size=BATCH_SIZE):
+        post.text_html = linebreaksbr(post.text, autoescape=True)
+        post.excerpt = Truncator(' '.join(post.text.split())).chars(
+            EXCERPT_LENGTH
+        )
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['text_html', 'excerpt'])
+            batch = []
+    Post.objects.bulk_update(batch, ['text_html', 'excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, help_text='Текст без переносов строк, обрезанный для карточки ленты', max_length=300, verbose_name='Начало текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, help_text='Экранированный текст с переносами строк, готовый к выводу', verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(render_texts, migrations.RunPython.noop),
+    ]
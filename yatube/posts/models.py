@@ -1,8 +1,28 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
 
 User = get_user_model()
 
+EXCERPT_LENGTH = 300
+
+FEED_FIELDS = (
+    'excerpt',
+    'pub_date',
+    'updated_at',
+    'image',
+    'renditions',
+    'comments_count',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__title',
+    'group__slug',
+)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -17,15 +37,72 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для карточек ленты: автор и группа одним JOIN,
+        без лишних колонок связанных таблиц.
+
+        Число комментариев берётся из денормализованного comments_count,
+        поэтому отдельная аннотация с COUNT не нужна.
+        """
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
+class Profile(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписок'
+    )
+
+    def __str__(self):
+        return self.user.username
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
         help_text='Введите текст поста'
     )
+    text_html = models.TextField(
+        'Текст в HTML',
+        blank=True,
+        editable=False,
+        help_text='Экранированный текст с переносами строк, готовый к выводу'
+    )
+    excerpt = models.CharField(
+        'Начало текста',
+        max_length=EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+        help_text='Текст без переносов строк, обрезанный для карточки ленты'
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикаций'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        help_text='Входит в ключ кэша карточки поста'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -46,14 +123,48 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    renditions = models.TextField(
+        'Размеры картинки',
+        blank=True,
+        editable=False,
+        help_text='Форматы и размеры готовых вариантов картинки в JSON'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    def render_text(self):
+        """Заполняет text_html и excerpt по text."""
+        self.text_html = linebreaksbr(self.text, autoescape=True)
+        self.excerpt = Truncator(' '.join(self.text.split())).chars(
+            EXCERPT_LENGTH
+        )
+
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx',
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -81,6 +192,12 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Коментарий'
         verbose_name_plural = 'Комментарий'
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx',
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -94,6 +211,11 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+    fanout = models.BooleanField(
+        default=True,
+        verbose_name='Рассылка в ленту',
+        help_text='Посты автора раскладываются в ленту подписчика при записи'
+    )
 
     class Meta:
         constraints = [
@@ -102,3 +224,84 @@ class Follow(models.Model):
                 name='unique_follower',
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикаций'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-id'],
+                name='timeline_user_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx',
+            ),
+        ]
+
+
+class SearchTerm(models.Model):
+    """Запись инвертированного индекса: основа слова и её частота в посте.
+
+    Используется поиском, когда у базы нет FTS5.
+    """
+    term = models.CharField(
+        max_length=100,
+        verbose_name='Основа слова'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+    weight = models.PositiveIntegerField(
+        verbose_name='Число вхождений'
+    )
+
+    class Meta:
+        verbose_name = 'Термин поиска'
+        verbose_name_plural = 'Термины поиска'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term',
+            ),
+        ]
@@ -0,0 +1,97 @@
+import json
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from . import caching
+from .models import Post
+from .thumbnails import run_in_background
+
+# Ширины для srcset и пропорция карточки, как у миниатюры 960x339.
+WIDTHS = (320, 640, 960, 1920)
+RATIO = 339 / 960
+QUALITY = {'webp': 80, 'jpeg': 85}
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def available_formats():
+    """WebP, если Pillow собран с ним, и JPEG как запасной вариант."""
+    if features.check('webp'):
+        return ['webp', 'jpeg']
+    return ['jpeg']
+
+
+def rendition_name(image_name, width, fmt):
+    # Имя производно от уникального имени оригинала: при замене картинки
+    # меняются и адреса, поэтому их можно кэшировать навсегда.
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'posts/renditions/{stem}/{width}.{EXTENSIONS[fmt]}'
+
+
+def rendition_url(image_name, width, fmt):
+    return default_storage.url(rendition_name(image_name, width, fmt))
+
+
+def parse(renditions):
+    """Разбирает сохранённое в Post.renditions описание размеров."""
+    if not renditions:
+        return None
+    try:
+        parsed = json.loads(renditions)
+    except ValueError:
+        return None
+    if not isinstance(parsed, dict) or not parsed.get('sizes'):
+        return None
+    return parsed
+
+
+def build(post_id):
+    """Строит все размеры картинки поста и записывает их в Post."""
+    post = Post.objects.only('image', 'author', 'group').get(pk=post_id)
+    if not post.image:
+        return
+    with post.image.open('rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    original = original.convert('RGB')
+    widths = [w for w in WIDTHS if w <= max(original.width, WIDTHS[0])]
+    formats = available_formats()
+    sizes = []
+    for width in widths:
+        height = round(width * RATIO)
+        image = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        for fmt in formats:
+            buffer = BytesIO()
+            image.save(
+                buffer, PIL_FORMATS[fmt], quality=QUALITY[fmt], optimize=True
+            )
+            name = rendition_name(post.image.name, width, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+        sizes.append([width, height])
+    # update() не трогает auto_now, а карточка с новой картинкой должна
+    # получить новый ключ кэша.
+    Post.objects.filter(pk=post_id, image=post.image.name).update(
+        renditions=json.dumps({'formats': formats, 'sizes': sizes}),
+        updated_at=timezone.now(),
+    )
+    scopes = [
+        (caching.FEED,),
+        (caching.AUTHOR, post.author_id),
+        (caching.POST, post.pk),
+    ]
+    if post.group_id:
+        scopes.append((caching.GROUP, post.group_id))
+    caching.bump(*scopes)
+
+
+def schedule(post):
+    """Ставит построение размеров в пул после фиксации транзакции."""
+    if post.image:
+        run_in_background(build, post.pk, key=f'renditions:{post.image.name}')
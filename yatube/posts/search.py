@@ -0,0 +1,179 @@
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import (Case, Count, ExpressionWrapper, F,
+                              FloatField, OuterRef, Subquery, Sum, Value,
+                              When)
+from django.db.models.expressions import RawSQL
+
+from .models import Post, SearchTerm
+from .stemming import tokens
+
+FTS_TABLE = 'posts_search'
+# Насыщение частоты слова, как у BM25: десятое повторение почти
+# ничего не добавляет к рангу.
+K1 = 1.2
+# Число постов для idf: ранг от него зависит слабо, поэтому COUNT(*) по
+# всей таблице делается раз в DOCUMENTS_TIMEOUT, а не на каждый поиск.
+DOCUMENTS_KEY = 'search:documents'
+DOCUMENTS_TIMEOUT = 60 * 10
+
+
+def query_terms(query):
+    """Основы слов запроса без повторов, в исходном порядке."""
+    return list(dict.fromkeys(term for term in tokens(query) if term))
+
+
+def document(post):
+    """Текст поста в том виде, в котором он попадает в индекс."""
+    return ' '.join(tokens(post.text))
+
+
+class Fts5Backend:
+    """Индекс SQLite FTS5 по основам слов; ранг — bm25."""
+
+    name = 'fts5'
+
+    def index(self, post):
+        self.index_many([post])
+
+    def index_many(self, posts):
+        rows = [(post.pk, document(post)) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk, _ in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                rows,
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, posts, terms):
+        match = ' '.join(f'"{term}"' for term in terms)
+        table = Post._meta.db_table
+        # bm25() тем меньше, чем лучше совпадение, а пагинация идёт
+        # по убыванию ранга, поэтому знак меняется.
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id',
+            (match,),
+            output_field=FloatField(),
+        )
+        # pk__in=RawSQL(...) оборачивает подзапрос во вторые скобки, и
+        # SQLite берёт из него только первую строку.
+        matched = (
+            f'{table}.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        )
+        return posts.extra(where=[matched], params=[match]).annotate(
+            rank=rank
+        )
+
+
+class PythonBackend:
+    """Инвертированный индекс в таблице SearchTerm.
+
+    Текст разбирается стеммером на Python, поэтому бэкенд работает на
+    любой базе. Ранг — сумма idf * tf с насыщением, как в BM25, но без
+    поправки на длину поста.
+    """
+
+    name = 'python'
+
+    def index(self, post):
+        self.index_many([post])
+
+    def index_many(self, posts):
+        posts = list(posts)
+        SearchTerm.objects.filter(post__in=posts).delete()
+        SearchTerm.objects.bulk_create(
+            SearchTerm(post_id=post.pk, term=term[:100], weight=weight)
+            for post in posts
+            for term, weight in Counter(tokens(post.text)).items()
+        )
+
+    def remove(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def idf(self, terms):
+        total = cache.get_or_set(
+            DOCUMENTS_KEY, Post.objects.count, DOCUMENTS_TIMEOUT
+        )
+        frequencies = dict(
+            SearchTerm.objects.filter(term__in=terms).order_by().values(
+                'term'
+            ).annotate(posts=Count('post')).values_list('term', 'posts')
+        )
+        return {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in frequencies.items()
+        }
+
+    def search(self, posts, terms):
+        idf = self.idf(terms)
+        if len(idf) < len(terms):
+            # Хотя бы одного слова нет ни в одном посте.
+            return posts.annotate(rank=Value(0.0, FloatField())).none()
+        saturated = ExpressionWrapper(
+            F('weight') * (K1 + 1) / (F('weight') + K1),
+            output_field=FloatField(),
+        )
+        score = SearchTerm.objects.filter(
+            post=OuterRef('pk'), term__in=terms
+        ).order_by().values('post').annotate(
+            score=Sum(Case(
+                *(When(term=term, then=saturated * Value(value))
+                  for term, value in idf.items()),
+                output_field=FloatField(),
+            ))
+        ).values('score')
+        for term in terms:
+            posts = posts.filter(
+                pk__in=SearchTerm.objects.filter(term=term).values('post')
+            )
+        return posts.annotate(rank=Subquery(score, output_field=FloatField()))
+
+
+_fts5_tables = {}
+
+
+def fts5_available():
+    name = connection.settings_dict['NAME']
+    if name not in _fts5_tables:
+        _fts5_tables[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts5_tables[name]
+
+
+def get_backend():
+    backend = settings.SEARCH_BACKEND
+    if backend == 'fts5' or backend == 'auto' and fts5_available():
+        return Fts5Backend()
+    return PythonBackend()
+
+
+def search_posts(posts, query):
+    """Посты, где встречаются все слова запроса, с рангом в rank."""
+    terms = query_terms(query)
+    if not terms:
+        return posts.annotate(rank=Value(0.0, FloatField())).none()
+    return get_backend().search(posts, terms)
@@ -0,0 +1,150 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, counters, search, timeline
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, **kwargs):
+    if created:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_profile(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_profile(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(pre_save, sender=Follow)
+def follow_adding(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance.fanout = not timeline.is_celebrity(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_profile(instance.author_id, 'followers_count', 1)
+        counters.bump_profile(instance.user_id, 'following_count', 1)
+        if instance.fanout:
+            timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_profile(instance.author_id, 'followers_count', -1)
+    counters.bump_profile(instance.user_id, 'following_count', -1)
+    timeline.trim(instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_author_id = None
+    instance._text_changed = True
+    if instance._state.adding:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'author_id', 'image', 'text'
+    ).first()
+    if previous is None:
+        return
+    (instance._previous_group_id, instance._previous_author_id,
+     previous_image, previous_text) = previous
+    instance._text_changed = previous_text != instance.text
+    if previous_image != instance.image.name:
+        # Старые размеры относятся к прежней картинке.
+        instance.renditions = ''
+
+
+@receiver(pre_save, sender=Post)
+def render_post_text(sender, instance, **kwargs):
+    # HTML и начало текста строятся один раз при записи, а не при каждом
+    # выводе поста.
+    if instance._text_changed:
+        instance.render_text()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    group_ids = {instance.group_id, getattr(
+        instance, '_previous_group_id', None
+    )} - {None}
+    author_ids = {instance.author_id, getattr(
+        instance, '_previous_author_id', None
+    )} - {None}
+    caching.forget_posts(instance.pk)
+    caching.bump(
+        (caching.FEED,),
+        (caching.POST, instance.pk),
+        *((caching.AUTHOR, author_id) for author_id in author_ids),
+        *((caching.GROUP, group_id) for group_id in group_ids),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    caching.bump((caching.POST, instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    caching.bump(
+        (caching.AUTHOR, instance.author_id),
+        (caching.AUTHOR, instance.user_id),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    # Адрес со старым slug отдаёт 404 и сам; новый slug может достаться
+    # другой группе, поэтому его связь с id забывается.
+    caching.forget_group(instance.slug)
+    caching.bump((caching.FEED,), (caching.GROUP, instance.pk))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_pages(sender, instance, created, update_fields=None,
+                          **kwargs):
+    # Вход обновляет только last_login, страницы от него не меняются.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    # Имя могло освободиться при переименовании и достаться новому
+    # пользователю, поэтому его связь с id забывается и при создании.
+    caching.forget_user(instance.username)
+    if not created:
+        caching.bump((caching.FEED,), (caching.AUTHOR, instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    if getattr(instance, '_text_changed', True):
+        search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
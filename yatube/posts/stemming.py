@@ -0,0 +1,134 @@
+"""Стеммер Портера (Snowball) для русского языка.
+
+Поиск индексирует и ищет основы слов, поэтому «котами» находит «кот».
+"""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+
+
+def compile_groups(after_a, plain):
+    """Окончания для strip(): множества и длины от большей к меньшей."""
+    lengths = sorted({len(ending) for ending in after_a + plain}, reverse=True)
+    return frozenset(after_a), frozenset(plain), lengths
+
+
+PERFECTIVE_GERUND = compile_groups(
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = compile_groups(
+    (),
+    ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+     'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+     'ая', 'яя', 'ою', 'ею'),
+)
+PARTICIPLE = compile_groups(
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = compile_groups((), ('ся', 'сь'))
+VERB = compile_groups(
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = compile_groups(
+    (),
+    ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+     'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+     'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+     'ья', 'я'),
+)
+DERIVATIONAL = compile_groups((), ('ост', 'ость'))
+SUPERLATIVE = compile_groups((), ('ейш', 'ейше'))
+
+WORD_RE = re.compile(r'\w+')
+
+
+def regions(word):
+    """Позиции начала RV и R2 по правилам Snowball."""
+    rv = r1 = r2 = len(word)
+    for index, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = index + 1
+            break
+    for start in range(1, len(word)):
+        if word[start - 1] in VOWELS and word[start] not in VOWELS:
+            r1 = start + 1
+            break
+    for start in range(r1 + 1, len(word)):
+        if word[start - 1] in VOWELS and word[start] not in VOWELS:
+            r2 = start + 1
+            break
+    return rv, r2
+
+
+def strip(word, start, groups):
+    """Отрезает самое длинное окончание из groups внутри word[start:].
+
+    Окончания первой группы допустимы только после «а» или «я».
+    Возвращает укороченное слово или None.
+    """
+    after_a, plain, lengths = groups
+    region = word[start:]
+    for length in lengths:
+        if length > len(region):
+            continue
+        ending = region[-length:]
+        if ending in plain or (
+            ending in after_a and len(region) > length
+            and region[-length - 1] in 'ая'
+        ):
+            return word[:-length]
+    return None
+
+
+def strip_adjectival(word, start):
+    stripped = strip(word, start, ADJECTIVE)
+    if stripped is None:
+        return None
+    return strip(stripped, start, PARTICIPLE) or stripped
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = regions(word)
+    # Шаг 1.
+    stripped = strip(word, rv, PERFECTIVE_GERUND)
+    if stripped is None:
+        word = strip(word, rv, REFLEXIVE) or word
+        for step in (
+            lambda w: strip_adjectival(w, rv),
+            lambda w: strip(w, rv, VERB),
+            lambda w: strip(w, rv, NOUN),
+        ):
+            stripped = step(word)
+            if stripped is not None:
+                break
+    if stripped is not None:
+        word = stripped
+    # Шаг 2.
+    if word[rv:].endswith('и'):
+        word = word[:-1]
+    # Шаг 3.
+    word = strip(word, r2, DERIVATIONAL) or word
+    # Шаг 4.
+    if word[rv:].endswith('нн'):
+        return word[:-1]
+    stripped = strip(word, rv, SUPERLATIVE)
+    if stripped is not None:
+        word = stripped
+        return word[:-1] if word[rv:].endswith('нн') else word
+    if word[rv:].endswith('ь'):
+        return word[:-1]
+    return word
+
+
+def tokens(text):
+    """Основы слов текста в порядке следования."""
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
@@ -0,0 +1,47 @@
+from django import template
+
+from ..renditions import parse, rendition_url
+
+register = template.Library()
+
+SIZES = '(max-width: 960px) 100vw, 960px'
+DEFAULT_WIDTH = 960
+MIME_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+
+def srcset(image_name, sizes, fmt):
+    return ', '.join(
+        f'{rendition_url(image_name, width, fmt)} {width}w'
+        for width, _ in sizes
+    )
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(post):
+    """Картинка поста с srcset по готовым размерам.
+
+    Пока размеры не построены, выводится миниатюра sorl, как раньше.
+    """
+    renditions = parse(post.renditions) if post.image else None
+    if not renditions:
+        return {'post': post}
+    sizes = renditions['sizes']
+    width, height = next(
+        (size for size in sizes if size[0] >= DEFAULT_WIDTH), sizes[-1]
+    )
+    fallback = renditions['formats'][-1]
+    return {
+        'post': post,
+        'sources': [
+            {
+                'type': MIME_TYPES[fmt],
+                'srcset': srcset(post.image.name, sizes, fmt),
+            }
+            for fmt in renditions['formats'][:-1]
+        ],
+        'src': rendition_url(post.image.name, width, fallback),
+        'srcset': srcset(post.image.name, sizes, fallback),
+        'sizes': SIZES,
+        'width': width,
+        'height': height,
+    }
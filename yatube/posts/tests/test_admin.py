@@ -0,0 +1,128 @@
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginator import EstimatedCountPaginator
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+        posts = [
+            Post(author=cls.admin, text=f'Пост {i}', group=cls.group)
+            for i in range(5)
+        ]
+        # bulk_create не шлёт pre_save, текст для карточек готовится здесь.
+        for post in posts:
+            post.render_text()
+        Post.objects.bulk_create(posts)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def test_changelist_uses_estimated_count(self):
+        """Список постов не считает всю таблицу через COUNT(*)."""
+        with mock.patch.object(
+            EstimatedCountPaginator, 'estimate_above', 0
+        ), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        counts = [q['sql'] for q in queries if 'COUNT(' in q['sql']]
+        self.assertEqual(counts, [])
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Автор и группа приходят одним JOIN, а не запросом на строку."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        Post.objects.bulk_create(
+            Post(author=self.admin, text='Ещё пост', group=self.group)
+            for _ in range(10)
+        )
+        with self.assertNumQueries(len(queries)):
+            self.client.get(self.url)
+
+    def test_group_column_has_no_full_dropdown(self):
+        """Поле группы и форма действия — автодополнение, а не список групп."""
+        response = self.client.get(self.url)
+        self.assertNotContains(response, 'Другая группа')
+        self.assertContains(
+            response, reverse('admin:posts_group_autocomplete'), count=6
+        )
+        self.assertContains(
+            response, '" selected>Тестовая группа</option>', count=5
+        )
+
+    def test_change_form_opens(self):
+        post = Post.objects.first()
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=(post.pk,))
+        )
+        self.assertContains(response, 'Тестовая группа')
+
+    def test_move_to_group_is_single_update(self):
+        posts = list(Post.objects.values_list('pk', flat=True)[:3])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'action': 'move_to_group',
+                'group': self.other_group.pk,
+                helpers.ACTION_CHECKBOX_NAME: posts,
+            })
+        self.assertEqual(response.status_code, 302)
+        updates = [q for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            Post.objects.filter(group=self.other_group).count(), 3
+        )
+
+    def test_move_to_group_needs_group(self):
+        post = Post.objects.first()
+        response = self.client.post(self.url, {
+            'action': 'move_to_group',
+            'group': '',
+            helpers.ACTION_CHECKBOX_NAME: [post.pk],
+        }, follow=True)
+        self.assertContains(response, 'Выберите группу')
+        post.refresh_from_db()
+        self.assertEqual(post.group, self.group)
+
+    def test_move_to_group_invalidates_group_page(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'other-slug'})
+        Client().get(url)
+        self.client.post(self.url, {
+            'action': 'move_to_group',
+            'group': self.other_group.pk,
+            helpers.ACTION_CHECKBOX_NAME: [Post.objects.first().pk],
+        })
+        self.assertContains(Client().get(url), 'Пост')
+
+    def test_search_uses_index(self):
+        post = Post.objects.create(author=self.admin, text='Рыжие коты')
+        response = self.client.get(self.url, {'q': 'кот'})
+        self.assertEqual(list(response.context['cl'].result_list), [post])
@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_pages_are_served_from_cache(self):
+        """Повторный анонимный запрос не ходит в базу."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(url)
+                self.assertContains(response, 'Тестовый пост')
+
+    def test_write_invalidates_cached_pages(self):
+        """Правка поста сразу видна на всех закэшированных страницах."""
+        for url in self.urls():
+            self.guest_client.get(url)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Исправленный пост', 'group': self.group.pk},
+        )
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Исправленный пост')
+
+    def test_moving_post_invalidates_old_group(self):
+        """Перенос поста в другую группу сбрасывает страницу старой."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.guest_client.get(url)
+        self.post.group = self.other_group
+        self.post.save()
+        response = self.guest_client.get(url)
+        self.assertNotContains(response, 'Тестовый пост')
+
+    def test_comment_invalidates_post_detail(self):
+        """Новый комментарий сбрасывает кэш страницы поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Свежий комментарий'
+        )
+        self.assertContains(self.guest_client.get(url), 'Свежий комментарий')
+
+    def test_authenticated_pages_are_not_cached(self):
+        """Авторизованным пользователям страница строится заново."""
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        self.author_client.get(url)
+        Post.objects.update(
+            text='Изменено в обход сигналов',
+            excerpt='Изменено в обход сигналов',
+            updated_at=timezone.now(),
+        )
+        response = self.author_client.get(url)
+        self.assertContains(response, 'Изменено в обход сигналов')
+
+    def test_cards_are_cached_by_post_version(self):
+        """Новый пост не перерисовывает карточки остальных."""
+        urls = self.urls()[:3]
+        for url in urls:
+            self.author_client.get(url)
+        # Без updated_at ключ карточки прежний, и она берётся из кэша.
+        Post.objects.update(
+            text='Изменено в обход сигналов',
+            excerpt='Изменено в обход сигналов',
+        )
+        Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.author_client.get(url)
+                self.assertContains(response, 'Новый пост')
+                self.assertContains(response, 'Тестовый пост')
+        self.post.refresh_from_db()
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.author_client.get(url), 'Изменено в обход сигналов'
+                )
+
+    def test_cards_follow_author_name(self):
+        """Переименованный автор сразу виден в карточках его постов."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.author_client.get(url)
+        User.objects.filter(pk=self.author.pk).update(
+            first_name='Лев', last_name='Толстой'
+        )
+        self.assertContains(self.author_client.get(url), 'Лев Толстой')
+
+    def test_rename_invalidates_author_and_group_pages(self):
+        """Переименование автора и группы видно на страницах из кэша."""
+        post_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': self.author}
+        )
+        for url in (post_url, profile_url):
+            self.guest_client.get(url)
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Лев'
+        author.last_name = 'Толстой'
+        author.save()
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        for url in (post_url, profile_url):
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Лев Толстой')
+        self.assertContains(self.guest_client.get(post_url), 'Новое название')
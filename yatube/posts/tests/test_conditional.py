@@ -0,0 +1,102 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_not_modified(self):
+        """Повторный визит с валидаторами получает 304 без выборки постов.
+
+        Вошедшему пользователю остаются только запросы сессии и
+        пользователя.
+        """
+        clients = ((self.guest_client, 0), (self.author_client, 2))
+        for client, queries in clients:
+            for url in self.urls():
+                with self.subTest(url=url):
+                    response = client.get(url)
+                    self.assertIn('no-cache', response['Cache-Control'])
+                    with self.assertNumQueries(queries):
+                        response = client.get(
+                            url, HTTP_IF_NONE_MATCH=response['ETag']
+                        )
+                    self.assertEqual(
+                        response.status_code, HTTPStatus.NOT_MODIFIED
+                    )
+
+    def test_last_modified_for_anonymous(self):
+        Post.objects.create(author=self.author, text='Ещё', group=self.group)
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = self.author_client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_write_changes_validator(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Новый комментарий'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_validator_depends_on_user_and_page(self):
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.guest_client.get(
+            url, {'cursor': 'x'}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_validator_depends_on_csrf_token(self):
+        """С новым CSRF-токеном (после входа) форма приходит заново."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.author_client.get(url)['ETag']
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        del self.author_client.cookies[settings.CSRF_COOKIE_NAME]
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'csrfmiddlewaretoken')
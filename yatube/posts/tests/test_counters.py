@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, Profile
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def profile(self, user):
+        return Profile.objects.get(user=user)
+
+    def test_posts_count_follows_create_and_delete(self):
+        """Счётчик постов растёт при создании и падает при удалении."""
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+        extra = Post.objects.create(author=self.author, text='Ещё')
+        self.assertEqual(self.profile(self.author).posts_count, 2)
+        extra.delete()
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+
+    def test_comments_count_follows_add_comment(self):
+        """add_comment увеличивает счётчик комментариев поста."""
+        self.reader_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Комментарий'},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_follow_counts_follow_and_unfollow(self):
+        """Подписка и отписка меняют счётчики обеих сторон."""
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}
+        ))
+        self.assertEqual(self.profile(self.author).followers_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}
+        ))
+        self.assertEqual(self.profile(self.author).followers_count, 0)
+        self.assertEqual(self.profile(self.reader).following_count, 0)
+
+    def test_profile_page_does_not_count_posts(self):
+        """Страница профиля не выполняет COUNT(*) по постам автора."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(reverse(
+                'posts:profile', kwargs={'username': self.author}
+            ))
+        self.assertContains(response, 'Всего постов: 1')
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_repair_counters_fixes_drift(self):
+        """Команда repair_counters чинит разошедшиеся счётчики."""
+        Profile.objects.filter(user=self.author).update(posts_count=7)
+        Comment.objects.create(post=self.post, author=self.reader, text='К')
+        Post.objects.filter(pk=self.post.pk).update(comments_count=0)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Profile.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('repair_counters', batch_size=1, stdout=out)
+        self.assertEqual(self.profile(self.author).posts_count, 1)
+        self.assertEqual(self.profile(self.reader).following_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertIn('Профили: расхождений 2', out.getvalue())
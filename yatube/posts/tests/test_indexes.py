@@ -0,0 +1,30 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from ..management.commands.explain_feeds import feed_queries
+
+EXPECTED_INDEXES = {
+    'index': 'post_date_idx',
+    'group_posts': 'post_group_date_idx',
+    'profile': 'post_author_date_idx',
+    'follow_index': 'timeline_user_date_idx',
+    'post_detail': 'comment_post_created_idx',
+    'followers': 'follow_author_user_idx',
+}
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Планы написаны для SQLite')
+class FeedIndexesTests(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Каждая лента выбирается по своему индексу без сортировки."""
+        for name, queryset in feed_queries():
+            with self.subTest(query=name):
+                plan = queryset.explain()
+                index = EXPECTED_INDEXES[name.split()[0]]
+                self.assertIn(f'INDEX {index}', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+                if name.endswith('(deep)'):
+                    self.assertNotIn(f'SCAN {queryset.model._meta.db_table}',
+                                     plan)
@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import EXCERPT_LENGTH, Group, Post
 
 User = get_user_model()
 
@@ -58,3 +58,20 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).verbose_name, expected_value)
+
+    def test_text_is_rendered_on_save(self):
+        """HTML и начало текста строятся при записи и при правке."""
+        post = Post.objects.create(
+            author=self.user, text='<b>Первая</b>\nвторая ' + 'слово ' * 100
+        )
+        self.assertTrue(post.text_html.startswith(
+            '&lt;b&gt;Первая&lt;/b&gt;<br>вторая'
+        ))
+        self.assertTrue(post.excerpt.startswith('<b>Первая</b> вторая'))
+        self.assertEqual(len(post.excerpt), EXCERPT_LENGTH)
+        post.text = 'Короткий'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(
+            (post.text_html, post.excerpt), ('Короткий', 'Короткий')
+        )
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryBudgetTests(TestCase):
+    """Число запросов ленты не зависит от числа карточек на странице."""
+
+    # Запросы сверх выборки ленты: сессия и пользователь для
+    # авторизованного клиента, группа или автор для их страниц и, при
+    # пустом кэше, их id для ключей инвалидации.
+    BUDGETS = {
+        'posts:index': 3,
+        'posts:group_list': 5,
+        'posts:profile': 6,
+        'posts:follow_index': 4,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def create_posts(self, count):
+        for i in range(count):
+            Post.objects.create(
+                author=self.authors[i % len(self.authors)],
+                group=self.group,
+                text=f'Тестовый пост {i}',
+            )
+
+    def urls(self):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': self.authors[0]}
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+    def assert_budgets(self):
+        for name, url in self.urls().items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(self.BUDGETS[name]):
+                    self.client.get(url)
+
+    def test_feed_budget_with_few_posts(self):
+        """Лента с парой карточек укладывается в бюджет запросов."""
+        self.create_posts(2)
+        self.assert_budgets()
+
+    def test_feed_budget_with_full_page(self):
+        """Полная страница ленты укладывается в тот же бюджет."""
+        self.create_posts(30)
+        self.assert_budgets()
+
+    def test_feeds_do_not_read_full_text(self):
+        """Ленты берут готовое начало текста, а не всю колонку text."""
+        self.create_posts(2)
+        for url in self.urls().values():
+            with self.subTest(url=url):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                for query in queries:
+                    self.assertNotIn('"posts_post"."text"', query['sql'])
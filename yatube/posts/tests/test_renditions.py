@@ -0,0 +1,111 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .. import renditions
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+def create_post(author, name='small.gif'):
+    return Post.objects.create(
+        author=author,
+        text='Тестовый пост',
+        image=SimpleUploadedFile(
+            name=name, content=SMALL_GIF, content_type='image/gif'
+        ),
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class RenditionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+
+    def setUp(self):
+        cache.clear()
+        self.post = create_post(self.user)
+
+    def render(self, post):
+        return Template(
+            '{% load post_images %}{% post_picture post %}'
+        ).render(Context({'post': post}))
+
+    def test_build_stores_sizes_and_files(self):
+        """Маленькая картинка даёт один размер минимальной ширины."""
+        renditions.build(self.post.pk)
+        self.post.refresh_from_db()
+        stored = json.loads(self.post.renditions)
+        self.assertEqual(stored['sizes'], [[320, 113]])
+        self.assertEqual(stored['formats'], renditions.available_formats())
+        for fmt in stored['formats']:
+            name = renditions.rendition_name(self.post.image.name, 320, fmt)
+            self.assertTrue(default_storage.exists(name))
+
+    def test_picture_has_srcset_and_dimensions(self):
+        """Шаблон выводит srcset и размеры, чтобы вёрстка не прыгала."""
+        renditions.build(self.post.pk)
+        self.post.refresh_from_db()
+        html = self.render(self.post)
+        url = renditions.rendition_url(self.post.image.name, 320, 'jpeg')
+        self.assertIn(f'srcset="{url} 320w"', html)
+        self.assertIn('width="320" height="113"', html)
+
+    def test_picture_falls_back_to_thumbnail(self):
+        """Пока размеры не построены, выводится обычная миниатюра."""
+        html = self.render(self.post)
+        self.assertIn('<img class="card-img my-2" src="', html)
+        self.assertNotIn('srcset', html)
+
+    def test_new_image_resets_renditions(self):
+        """Замена картинки сбрасывает устаревшие размеры."""
+        renditions.build(self.post.pk)
+        self.post.refresh_from_db()
+        self.post.image = SimpleUploadedFile(
+            name='other.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+        self.post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.renditions, '')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class BuildRenditionsCommandTests(TransactionTestCase):
+    def test_command_fills_missing_renditions(self):
+        user = User.objects.create_user(username='HasNoName')
+        posts = [create_post(user) for _ in range(3)]
+        Post.objects.create(author=user, text='Без картинки')
+        out = StringIO()
+        call_command('build_renditions', '--workers', '2', stdout=out)
+        self.assertIn('Построено: 3, ошибок: 0', out.getvalue())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertTrue(post.renditions)
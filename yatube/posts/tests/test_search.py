@@ -0,0 +1,140 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post, SearchTerm
+from ..search import get_backend, search_posts
+from ..stemming import stem
+from ..utils import NUM_OF_POSTS
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        """Разные формы слова сводятся к одной основе."""
+        for forms in (
+            ('кот', 'коты', 'котами', 'кота'),
+            ('книга', 'книги', 'книгами'),
+            ('ёлка', 'елки'),
+        ):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stem(form) for form in forms}), 1)
+
+
+class SearchMixin:
+    backend = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.override = override_settings(SEARCH_BACKEND=self.backend)
+        self.override.enable()
+        self.addCleanup(self.override.disable)
+        self.client = Client()
+
+    def search(self, **params):
+        response = self.client.get(reverse('posts:search'), params)
+        return list(response.context['page_obj'])
+
+    def test_finds_word_forms_ranked(self):
+        """Поиск находит другие формы слова; частые совпадения выше."""
+        once = Post.objects.create(author=self.author, text='Рыжий кот')
+        twice = Post.objects.create(
+            author=self.author, text='Котами и про котов'
+        )
+        Post.objects.create(author=self.author, text='Собака')
+        self.assertEqual(self.search(q='коты'), [twice, once])
+
+    def test_all_words_required(self):
+        post = Post.objects.create(author=self.author, text='Кот ест рыбу')
+        Post.objects.create(author=self.author, text='Кот спит')
+        self.assertEqual(self.search(q='кот рыба'), [post])
+        self.assertEqual(self.search(q='кот слон'), [])
+
+    def test_group_and_author_filters(self):
+        in_group = Post.objects.create(
+            author=self.author, text='Кот', group=self.group
+        )
+        Post.objects.create(author=self.author, text='Кот')
+        by_other = Post.objects.create(author=self.other, text='Кот')
+        self.assertEqual(self.search(q='кот', group='test-slug'), [in_group])
+        self.assertEqual(self.search(q='кот', author='other'), [by_other])
+
+    def test_cursor_pages_cover_all_results(self):
+        """Курсор проходит все результаты без повторов и пропусков."""
+        posts = [
+            Post.objects.create(author=self.author, text='кот ' * (i % 3 + 1))
+            for i in range(NUM_OF_POSTS + 5)
+        ]
+        response = self.client.get(reverse('posts:search'), {'q': 'кот'})
+        first = list(response.context['page_obj'])
+        cursor = response.context['page_obj'].paginator.next_cursor
+        second = self.search(q='кот', cursor=cursor)
+        self.assertEqual(len(first), NUM_OF_POSTS)
+        self.assertEqual(
+            {post.pk for post in first + second}, {post.pk for post in posts}
+        )
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.create(author=self.author, text='Кот')
+        post.text = 'Собака'
+        post.save()
+        self.assertEqual(self.search(q='кот'), [])
+        self.assertEqual(self.search(q='собаки'), [post])
+        post.delete()
+        self.assertEqual(self.search(q='собаки'), [])
+
+    def test_rebuild_command_indexes_existing_posts(self):
+        post = Post.objects.create(author=self.author, text='Кот')
+        Post.objects.filter(pk=post.pk).update(text='Лиса')
+        out = StringIO()
+        call_command('rebuild_search_index', '--batch-size', '1', stdout=out)
+        self.assertEqual(self.search(q='лисы'), [post])
+        self.assertIn('1 постов', out.getvalue())
+
+
+class Fts5SearchTests(SearchMixin, TestCase):
+    backend = 'fts5'
+
+    def test_backend_is_fts5(self):
+        self.assertEqual(get_backend().name, 'fts5')
+
+
+class PythonSearchTests(SearchMixin, TestCase):
+    backend = 'python'
+
+    def test_terms_are_stored_with_frequency(self):
+        post = Post.objects.create(author=self.author, text='Кот и коты')
+        self.assertEqual(
+            dict(post.search_terms.values_list('term', 'weight')),
+            {'кот': 2, 'и': 1},
+        )
+
+    def test_empty_query_finds_nothing(self):
+        Post.objects.create(author=self.author, text='Кот')
+        self.assertFalse(search_posts(Post.objects.all(), '!!!').exists())
+        self.assertFalse(SearchTerm.objects.filter(term='').exists())
+
+    def test_document_count_is_cached(self):
+        """Число постов для idf не считается заново на каждый поиск."""
+        Post.objects.create(author=self.author, text='Кот')
+        backend = get_backend()
+        backend.idf(['кот'])
+        # Остаётся только частота слов запроса.
+        with self.assertNumQueries(1):
+            self.assertEqual(list(backend.idf(['кот'])), ['кот'])
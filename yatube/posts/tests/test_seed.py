@@ -0,0 +1,45 @@
+import shutil
+import statistics
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Follow, Group, Post, Profile, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class SeedDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_data', '--users', '30', '--groups', '3', '--posts', '60',
+            '--comments', '80', '--follows', '5', '--images', '1',
+            '--batch-size', '25', stdout=StringIO(),
+        )
+
+    def test_counts(self):
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Profile.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 80)
+        self.assertTrue(Follow.objects.exists())
+
+    def test_power_law(self):
+        """Самый популярный автор заметно популярнее типичного."""
+        followers = list(Profile.objects.values_list(
+            'followers_count', flat=True
+        ))
+        self.assertGreater(max(followers), statistics.median(followers))
+        posts = list(Profile.objects.values_list('posts_count', flat=True))
+        self.assertGreater(max(posts), 2 * statistics.median(posts))
+        self.assertEqual(sum(posts), 60)
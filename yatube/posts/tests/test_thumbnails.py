@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def run_on_commit(callback):
+    callback()
+
+
+def noop():
+    pass
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=2)
+@mock.patch('posts.thumbnails.transaction.on_commit', run_on_commit)
+class DeferredThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnails._pending.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    def get_thumbnail(self):
+        geometry, options = thumbnails.RENDITIONS[0]
+        return default.backend.get_thumbnail(
+            self.post.image, geometry, **options
+        )
+
+    def test_miss_returns_original_and_schedules_job(self):
+        """Без готовой миниатюры шаблон получает оригинал, а не ждёт."""
+        with mock.patch('posts.thumbnails.submit') as submit:
+            image = self.get_thumbnail()
+            self.get_thumbnail()
+        self.assertEqual(image.url, self.post.image.url)
+        submit.assert_called_once()
+
+    def test_generated_thumbnail_is_served(self):
+        """После работы пула отдаётся готовая миниатюра."""
+        with override_settings(THUMBNAIL_WORKERS=0):
+            thumbnails.schedule(self.post.image)
+        with mock.patch('posts.thumbnails.submit') as submit:
+            image = self.get_thumbnail()
+        submit.assert_not_called()
+        self.assertNotEqual(image.url, self.post.image.url)
+        self.assertTrue(image.exists())
+
+    def test_rollback_does_not_block_key(self):
+        """Задача из откатившейся транзакции не мешает следующей."""
+        with mock.patch('posts.thumbnails.transaction.on_commit'):
+            thumbnails.run_in_background(noop, key='key')
+        with mock.patch('posts.thumbnails.submit') as submit:
+            thumbnails.run_in_background(noop, key='key')
+        submit.assert_called_once()
+
+    def test_request_thread_keeps_connection(self):
+        """Без пула задача не закрывает соединение запроса."""
+        with override_settings(THUMBNAIL_WORKERS=0), \
+                mock.patch('posts.thumbnails.connections') as connections:
+            thumbnails.submit(noop)
+        connections.close_all.assert_not_called()
+
+    def test_post_create_schedules_renditions(self):
+        """post_create ставит миниатюры загруженной картинки в очередь."""
+        client = Client()
+        client.force_login(self.user)
+        with mock.patch('posts.views.thumbnails.schedule') as schedule, \
+                mock.patch('posts.views.renditions.schedule') as build:
+            client.post(reverse('posts:post_create'), data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(
+                    name='new.gif', content=SMALL_GIF,
+                    content_type='image/gif',
+                ),
+            })
+        post = Post.objects.get(text='Пост с картинкой')
+        schedule.assert_called_once_with(post.image)
+        build.assert_called_once_with(post)
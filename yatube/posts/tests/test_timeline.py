@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Пост до подписки',
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_post_fans_out(self):
+        """Подписка заполняет ленту, новый пост в неё раскладывается."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        entries = TimelineEntry.objects.filter(user=self.reader)
+        self.assertEqual(
+            set(entries.values_list('post', flat=True)),
+            {self.old_post.pk, new_post.pk},
+        )
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.feed(), [])
+
+    def test_celebrity_posts_are_read_on_demand(self):
+        """Посты знаменитостей не раскладываются, а читаются из Post."""
+        with mock.patch('posts.timeline.CELEBRITY_FOLLOWERS', 0):
+            follow = Follow.objects.create(
+                user=self.reader, author=self.author
+            )
+        self.assertFalse(follow.fanout)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.feed(), [new_post, self.old_post])
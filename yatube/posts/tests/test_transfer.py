@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import timeline, transfer
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+from ..search import search_posts
+
+User = get_user_model()
+
+PUB_DATE = datetime(2020, 5, 17, 12, 0, tzinfo=timezone.utc)
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(7):
+            post = Post.objects.create(
+                author=author, text=f'Пост про котов {i}', group=group
+            )
+            Comment.objects.create(post=post, author=reader, text='Коммент')
+        Post.objects.update(pub_date=PUB_DATE)
+        Follow.objects.create(user=reader, author=author)
+
+    def export(self, *args):
+        call_command(
+            'export_posts', self.directory, *args, stdout=StringIO()
+        )
+
+    def wipe(self):
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка в пустую базу восстанавливают данные."""
+        for fmt in transfer.FORMATS:
+            with self.subTest(fmt=fmt):
+                self.export('--format', fmt)
+                ids = set(Post.objects.values_list('pk', flat=True))
+                self.wipe()
+                out = StringIO()
+                call_command(
+                    'import_posts', self.directory, '--format', fmt,
+                    '--batch-size', '3', stdout=out,
+                )
+                self.assertIn('строк/с', out.getvalue())
+                self.assertEqual(
+                    set(Post.objects.values_list('pk', flat=True)), ids
+                )
+                post = Post.objects.select_related(
+                    'author__profile', 'group'
+                ).first()
+                self.assertEqual(post.pub_date, PUB_DATE)
+                self.assertEqual(post.group.slug, 'test-slug')
+                self.assertEqual(post.comments_count, 1)
+                self.assertEqual(post.author.profile.posts_count, 7)
+                self.assertEqual(post.author.profile.followers_count, 1)
+                self.assertEqual(Comment.objects.count(), 7)
+                reader = User.objects.get(username='reader')
+                self.assertEqual(reader.timeline.count(), 7)
+                self.assertEqual(
+                    search_posts(Post.objects.all(), 'кот').count(), 7
+                )
+
+    def test_import_twice_does_not_duplicate(self):
+        self.export()
+        out = StringIO()
+        call_command('import_posts', self.directory, stdout=out)
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertEqual(Comment.objects.count(), 7)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(TimelineEntry.objects.count(), 7)
+
+    def test_import_skips_taken_ids(self):
+        """Занятый id не перезаписывает чужой пост и попадает в отчёт."""
+        self.export()
+        ids = sorted(Post.objects.values_list('pk', flat=True))
+        Post.objects.all().delete()
+        stranger = User.objects.create_user(username='stranger')
+        Post.objects.create(pk=ids[0], author=stranger, text='Чужой пост')
+        err = StringIO()
+        call_command(
+            'import_posts', self.directory, '--kinds', 'posts',
+            stdout=StringIO(), stderr=err,
+        )
+        self.assertIn(f'id уже заняты, строки пропущены: {ids[0]}',
+                      err.getvalue())
+        post = Post.objects.get(pk=ids[0])
+        self.assertEqual(post.text, 'Чужой пост')
+        self.assertNotEqual(post.pub_date, PUB_DATE)
+        self.assertEqual(Post.objects.filter(pub_date=PUB_DATE).count(), 6)
+        self.assertEqual(
+            search_posts(Post.objects.all(), 'кот').count(), 6
+        )
+        reader = User.objects.get(username='reader')
+        self.assertEqual(reader.timeline.count(), 6)
+        self.assertFalse(reader.timeline.filter(post_id=ids[0]).exists())
+
+    def test_import_backfills_only_new_follows(self):
+        self.export('--kinds', 'follows')
+        path = transfer.path_for(self.directory, 'follows', transfer.NDJSON)
+        with open(path, 'a') as file:
+            file.write('{"user": "newbie", "author": "author"}\n')
+        TimelineEntry.objects.all().delete()
+        call_command(
+            'import_posts', self.directory, '--kinds', 'follows',
+            stdout=StringIO(),
+        )
+        self.assertEqual(Follow.objects.count(), 2)
+        newbie = User.objects.get(username='newbie')
+        self.assertEqual(newbie.timeline.count(), 7)
+        reader = User.objects.get(username='reader')
+        self.assertFalse(reader.timeline.exists())
+
+    def test_import_keeps_fanout_of_existing_follows(self):
+        self.export('--kinds', 'follows')
+        path = transfer.path_for(self.directory, 'follows', transfer.NDJSON)
+        with open(path, 'a') as file:
+            file.write('{"user": "newbie", "author": "author"}\n')
+        with mock.patch.object(timeline, 'CELEBRITY_FOLLOWERS', 1):
+            call_command(
+                'import_posts', self.directory, '--kinds', 'follows',
+                stdout=StringIO(),
+            )
+        self.assertTrue(Follow.objects.get(user__username='reader').fanout)
+        self.assertFalse(Follow.objects.get(user__username='newbie').fanout)
+
+    def test_export_resumes_from_checkpoint(self):
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        first = Post.objects.order_by('pk').values_list('pk', flat=True)[3]
+        with open(checkpoint, 'w') as file:
+            json.dump({'posts': first}, file)
+        path = transfer.path_for(self.directory, 'posts', transfer.NDJSON)
+        with open(path, 'w') as file:
+            file.write('{"id": 0}\n')
+        self.export('--kinds', 'posts', '--checkpoint', checkpoint)
+        with open(path) as file:
+            self.assertEqual(len(file.readlines()), 1 + 3)
+        with open(checkpoint) as file:
+            self.assertEqual(
+                json.load(file)['posts'], Post.objects.latest('pk').pk
+            )
+
+    def test_export_drops_rows_written_after_checkpoint(self):
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        self.export('--kinds', 'posts', '--checkpoint', checkpoint)
+        path = transfer.path_for(self.directory, 'posts', transfer.NDJSON)
+        with open(checkpoint) as file:
+            saved = json.load(file)
+        # Сбой после записи пачки, но до сохранения контрольной точки.
+        saved['posts'] = Post.objects.order_by('pk').values_list(
+            'pk', flat=True
+        )[3]
+        with open(path) as file:
+            lines = file.readlines()
+        saved['offsets']['posts'] = len(''.join(lines[:4]).encode())
+        with open(checkpoint, 'w') as file:
+            json.dump(saved, file)
+        self.export('--kinds', 'posts', '--checkpoint', checkpoint)
+        with open(path) as file:
+            self.assertEqual(file.readlines(), lines)
+
+    def test_import_resumes_from_checkpoint(self):
+        self.export()
+        self.wipe()
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        with open(checkpoint, 'w') as file:
+            json.dump({'posts': 5}, file)
+        call_command(
+            'import_posts', self.directory, '--kinds', 'groups', 'posts',
+            '--checkpoint', checkpoint, stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 2)
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file), {'groups': 1, 'posts': 7})
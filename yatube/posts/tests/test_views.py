@@ -9,7 +9,8 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post
+from ..utils import CursorPaginator
 
 User = get_user_model()
 
@@ -195,17 +196,17 @@ class PostPagesTests(TestCase):
 
     def test_index_page_have_cache(self):
         """Проверка работы кэша."""
+        cache.clear()
         response = self.author.get(reverse('posts:index'))
-        response_before_del = response.content
-        Post.objects.all().delete()
+        response_before_update = response.content
+        Post.objects.update(text='Изменено в обход сигналов')
         response_2 = self.author.get(reverse('posts:index'))
-        response_after_del = response_2.content
-        self.assertEqual(len(response_before_del), len(response_after_del))
-        cache.clear()
+        self.assertEqual(response_before_update, response_2.content)
+        Post.objects.all().delete()
         response_3 = self.author.get(reverse('posts:index'))
-        response_after_cahce_clear = response_3.content
-        self.assertNotEqual(len(response_before_del),
-                            len(response_after_cahce_clear))
+        response_after_del = response_3.content
+        self.assertNotEqual(len(response_before_update),
+                            len(response_after_del))
 
     def test_page_follow(self):
         """Проверка работы подписки:
@@ -304,18 +305,92 @@ class PaginatorViewsTest(TestCase):
     def test_paginator(self):
         """Проверка работы паджинатора."""
         cache.clear()
-        reverse_name_post_count = {
-            reverse('posts:index'): 10,
-            reverse('posts:index') + '?page=2': 5,
-            reverse('posts:group_list',
-                    kwargs={'slug': self.group.slug}): 10,
-            reverse('posts:group_list',
-                    kwargs={'slug': self.group.slug}) + '?page=2': 5,
-            reverse('posts:profile',
-                    kwargs={'username': self.post.author}): 10,
-            reverse('posts:profile',
-                    kwargs={'username': self.post.author}) + '?page=2': 5,
-        }
-        for reverse_name, post_count in reverse_name_post_count.items():
-            response = self.author.get(reverse_name)
-            self.assertEqual(len(response.context['page_obj']), post_count)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.post.author}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first_page = self.author.get(url).context['page_obj']
+                self.assertEqual(len(first_page), 10)
+                self.assertFalse(first_page.has_previous())
+                next_cursor = first_page.paginator.next_cursor
+                second_page = self.author.get(
+                    url, {'cursor': next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), 5)
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    set(first_page) & set(second_page), set()
+                )
+                previous_cursor = second_page.paginator.previous_cursor
+                back_page = self.author.get(
+                    url, {'cursor': previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back_page), list(first_page))
+
+    def test_paginator_skips_count_query(self):
+        """Курсорная страница выбирается одним запросом без COUNT."""
+        posts = Post.objects.all()
+        with self.assertNumQueries(1):
+            page_obj = CursorPaginator(posts, 10).get_page(None)
+            self.assertEqual(len(page_obj), 10)
+        cursor = page_obj.paginator.last_cursor
+        last_page = CursorPaginator(posts, 10).get_page(cursor)
+        self.assertEqual(list(last_page), list(posts)[-10:])
+        self.assertTrue(last_page.has_previous())
+        self.assertFalse(last_page.has_next())
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        for i in range(25):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{i}'),
+                text=f'Комментарий {i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_comments_page(self):
+        """post_detail выводит первую страницу комментариев."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertTrue(comments.has_next())
+
+    def test_load_more_returns_fragment(self):
+        """Эндпоинт комментариев отдаёт следующую порцию фрагментом."""
+        detail = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        ))
+        cursor = detail.context['comments'].paginator.next_cursor
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': cursor},
+        )
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 5)
+        self.assertFalse(comments.has_next())
+
+    def test_newest_comments_first(self):
+        """?order=newest разворачивает порядок комментариев."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            {'order': 'newest'},
+        )
+        self.assertEqual(
+            response.context['comments'][0].text, 'Комментарий 24'
+        )
@@ -0,0 +1,132 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import tokey
+from sorl.thumbnail.images import ImageFile
+
+logger = logging.getLogger(__name__)
+
+# Размеры, которые показывают шаблоны лент и страницы поста.
+RENDITIONS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def run_job(func, *args, key=None):
+    """Выполняет задачу; ошибки только логируются."""
+    try:
+        return func(*args)
+    except Exception:
+        logger.exception('Фоновая задача %s упала', func.__name__)
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def run_in_worker(func, *args, key=None):
+    """Задача в потоке пула: его соединения с базой закрываются после."""
+    try:
+        return run_job(func, *args, key=key)
+    finally:
+        connections.close_all()
+
+
+def submit(func, *args, key=None):
+    if settings.THUMBNAIL_WORKERS:
+        return get_executor().submit(run_in_worker, func, *args, key=key)
+    # Без пула задача идёт в потоке запроса: его соединения не трогаем.
+    return run_job(func, *args, key=key)
+
+
+def run_in_background(func, *args, key=None):
+    """Ставит задачу в пул после фиксации транзакции, без повторов по key.
+
+    key занимается только при фиксации: после отката транзакции задача
+    не запускается и не должна мешать следующим.
+    """
+    def start():
+        if key is not None:
+            with _lock:
+                if key in _pending:
+                    return
+                _pending.add(key)
+        submit(func, *args, key=key)
+
+    transaction.on_commit(start)
+
+
+def generate(name, geometry, options):
+    """Строит миниатюру и кладёт её в хранилище sorl."""
+    default.backend.generate(name, geometry, **options)
+
+
+def schedule(file_, renditions=RENDITIONS):
+    """Ставит построение миниатюр в очередь после фиксации транзакции."""
+    name = getattr(file_, 'name', file_)
+    if not name:
+        return
+    for geometry, options in renditions:
+        run_in_background(
+            generate, name, geometry, dict(options),
+            key=tokey(name, geometry, sorted(options.items())),
+        )
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который не строит миниатюры внутри запроса.
+
+    Готовая миниатюра берётся из хранилища ключей sorl. Если её ещё нет,
+    построение уходит в пул потоков, а шаблон получает оригинал.
+    """
+
+    def _thumbnail_file(self, source, geometry_string, options):
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        thumbnail = self._thumbnail_file(
+            source, geometry_string, dict(options)
+        )
+        cached = default.kvstore.get(thumbnail)
+        if cached:
+            return cached
+        if not settings.THUMBNAIL_WORKERS:
+            return self.generate(file_, geometry_string, **options)
+        schedule(file_, ((geometry_string, options),))
+        return source
+
+    def generate(self, file_, geometry_string, **options):
+        return super().get_thumbnail(file_, geometry_string, **options)
@@ -0,0 +1,98 @@
+from django.db.models import Q
+
+from .models import FEED_FIELDS, Follow, Post, Profile, TimelineEntry
+from .utils import get_page_context
+
+CELEBRITY_FOLLOWERS = 1000
+TIMELINE_BACKFILL = 1000
+BATCH_SIZE = 500
+
+
+def is_celebrity(author):
+    """Авторов с огромной аудиторией читаем при запросе, а не раскладываем."""
+    return Profile.objects.filter(
+        user=author, followers_count__gte=CELEBRITY_FOLLOWERS
+    ).exists()
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id, fanout=True
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    backfill_many([follow])
+
+
+def backfill_many(follows):
+    """backfill для пачки подписок: один проход на автора, а не на пару."""
+    readers = {}
+    for follow in follows:
+        readers.setdefault(follow.author_id, []).append(follow.user_id)
+    for author_id, user_ids in readers.items():
+        posts = Post.objects.filter(author_id=author_id).values_list(
+            'pk', 'pub_date'
+        )[:TIMELINE_BACKFILL]
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=pk,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for pk, pub_date in posts
+                for user_id in user_ids
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def trim(follow):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+
+
+def get_follow_page(user, request, columns=FEED_FIELDS):
+    """Страница ленты подписок.
+
+    Обычно это один проход по индексу (user, -pub_date) таблицы
+    TimelineEntry. Если пользователь подписан на знаменитостей, их посты
+    подмешиваются при чтении. columns — поля поста, которые нужны
+    странице, как в only(); связанные автор и группа из них приходят тем
+    же запросом.
+    """
+    relations = {column.split('__')[0] for column in columns if '__' in column}
+    fields = {*columns, *relations}
+    pulled = Follow.objects.filter(user=user, fanout=False).values('author')
+    if not pulled.exists():
+        entries = TimelineEntry.objects.filter(user=user).select_related(
+            'post', *(f'post__{relation}' for relation in relations)
+        ).only('pub_date', 'post', *(f'post__{f}' for f in fields))
+        page_obj = get_page_context(entries, request)
+        page_obj.object_list = [entry.post for entry in page_obj]
+        return page_obj
+    posts = Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=pulled)
+    ).select_related(*relations).only(*fields)
+    return get_page_context(posts, request)
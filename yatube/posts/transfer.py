@@ -0,0 +1,385 @@
+"""Потоковый экспорт и импорт групп, постов, комментариев и подписок.
+
+Каждый вид данных лежит в своём файле NDJSON или CSV в одной папке.
+Строки читаются и пишутся генераторами пачками по batch_size, так что
+память не зависит от объёма выгрузки. Посты и комментарии сохраняют
+свои id: комментарии ссылаются на пост по id, а повторный импорт той
+же пачки после сбоя ничего не дублирует. Строки с id, который в базе уже
+занят, пропускаются целиком — даты, поиск и ленты трогают только
+вставленные записи, — а их id импортёр возвращает, чтобы команда о них
+сообщила.
+"""
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, search, timeline
+from .models import (Comment, Follow, Group, Post, Profile, TimelineEntry,
+                     User)
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = (NDJSON, CSV)
+
+KINDS = ('groups', 'posts', 'comments', 'follows')
+
+FIELDS = {
+    'groups': ('slug', 'title', 'description'),
+    'posts': ('id', 'text', 'pub_date', 'author', 'group', 'image'),
+    'comments': ('id', 'post', 'author', 'text', 'created'),
+    'follows': ('user', 'author'),
+}
+
+
+def path_for(directory, kind, fmt):
+    return os.path.join(directory, f'{kind}.{fmt}')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Checkpoint:
+    """Позиция, до которой работа уже сделана, в JSON-файле.
+
+    Файл переписывается через временный и os.replace, поэтому сбой во
+    время записи не оставит его битым. Экспорт хранит рядом с позицией
+    длину файла выгрузки: строки, записанные после неё, при продолжении
+    отрезаются и выгружаются заново.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.positions = {}
+        if path and os.path.exists(path):
+            with open(path) as file:
+                self.positions = json.load(file)
+
+    def get(self, kind):
+        return self.positions.get(kind, 0)
+
+    def offset(self, kind):
+        return self.positions.get('offsets', {}).get(kind)
+
+    def save(self, kind, position, offset=None):
+        self.positions[kind] = position
+        if offset is not None:
+            self.positions.setdefault('offsets', {})[kind] = offset
+        if not self.path:
+            return
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self.positions, file)
+        os.replace(temporary, self.path)
+
+
+class Throughput:
+    """Считает строки и скорость для отчёта команды."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.rows = 0
+
+    def add(self, rows):
+        self.rows += rows
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return f'{self.rows} строк, {self.rate:.0f} строк/с'
+
+
+# Экспорт.
+
+def export_rows(kind, after=0):
+    """Строки вида kind с ключом больше after, по возрастанию ключа.
+
+    Выдаёт пары (ключ, строка); ключ идёт в контрольную точку.
+    """
+    if kind == 'groups':
+        rows = Group.objects.values_list('pk', *FIELDS['groups'])
+    elif kind == 'posts':
+        rows = Post.objects.values_list(
+            'pk', 'pk', 'text', 'pub_date', 'author__username',
+            'group__slug', 'image',
+        )
+    elif kind == 'comments':
+        rows = Comment.objects.values_list(
+            'pk', 'pk', 'post_id', 'author__username', 'text', 'created',
+        )
+    else:
+        rows = Follow.objects.values_list(
+            'pk', 'user__username', 'author__username'
+        )
+    rows = rows.filter(pk__gt=after).order_by('pk')
+    for key, *values in rows.iterator(chunk_size=2000):
+        yield key, dict(zip(FIELDS[kind], values))
+
+
+def dump_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def write_rows(file, fmt, kind, rows, header=True):
+    """Пишет строки в файл и выдаёт их дальше, не накапливая."""
+    if fmt == CSV:
+        writer = csv.DictWriter(file, fieldnames=FIELDS[kind])
+        if header:
+            writer.writeheader()
+    for key, row in rows:
+        row = {field: dump_value(value) for field, value in row.items()}
+        if fmt == CSV:
+            writer.writerow(row)
+        else:
+            file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        yield key
+
+
+# Импорт.
+
+def read_rows(file, fmt):
+    if fmt == CSV:
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def user_ids(usernames):
+    """id пользователей по именам; недостающие создаются."""
+    usernames = set(usernames)
+    existing = dict(User.objects.filter(username__in=usernames).values_list(
+        'username', 'pk'
+    ))
+    missing = usernames - set(existing)
+    if missing:
+        # bulk_create не шлёт post_save, профили заводятся здесь же.
+        User.objects.bulk_create(
+            (User(username=name) for name in missing), ignore_conflicts=True
+        )
+        created = dict(User.objects.filter(username__in=missing).values_list(
+            'username', 'pk'
+        ))
+        Profile.objects.bulk_create(
+            (Profile(user_id=pk) for pk in created.values()),
+            ignore_conflicts=True,
+        )
+        # Сигнал post_save не пришёл: имя могло принадлежать раньше
+        # другому пользователю.
+        for name in created:
+            caching.forget_user(name)
+        existing.update(created)
+    return existing
+
+
+def group_ids(slugs):
+    slugs = set(slugs) - {None, ''}
+    return dict(Group.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+
+
+def split_taken(model, objects):
+    """Объекты с ещё свободными id и отсортированные занятые id."""
+    taken = set(model.objects.filter(
+        pk__in=[obj.pk for obj in objects]
+    ).values_list('pk', flat=True))
+    return [obj for obj in objects if obj.pk not in taken], sorted(taken)
+
+
+def bulk_create_dated(model, objects, field):
+    """bulk_create с датами из выгрузки.
+
+    auto_now_add подменяет дату на текущую при вставке, поэтому даты
+    возвращаются одним executemany на пачку.
+    """
+    dates = {
+        obj.pk: getattr(obj, field)
+        for obj in objects if getattr(obj, field) is not None
+    }
+    model.objects.bulk_create(objects)
+    if not dates:
+        return
+    opts = model._meta
+    column = opts.get_field(field)
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {quote(opts.db_table)} SET {quote(column.column)} = %s '
+            f'WHERE {quote(opts.pk.column)} = %s',
+            [
+                (column.get_db_prep_value(date, connection), pk)
+                for pk, date in dates.items()
+            ],
+        )
+    for obj in objects:
+        if obj.pk in dates:
+            setattr(obj, field, dates[obj.pk])
+
+
+def import_groups(rows):
+    Group.objects.bulk_create(
+        (Group(**{field: row[field] for field in FIELDS['groups']})
+         for row in rows),
+        ignore_conflicts=True,
+    )
+    slugs = [row['slug'] for row in rows]
+    for slug in slugs:
+        caching.forget_group(slug)
+    caching.bump(
+        *((caching.GROUP, pk) for pk in group_ids(slugs).values())
+    )
+
+
+def import_posts(rows):
+    users = user_ids(row['author'] for row in rows)
+    groups = group_ids(row['group'] for row in rows)
+    posts = [
+        Post(
+            pk=int(row['id']),
+            text=row['text'],
+            pub_date=parse_datetime(row['pub_date']),
+            author_id=users[row['author']],
+            group_id=groups.get(row['group']),
+            image=row.get('image') or '',
+        )
+        for row in rows
+    ]
+    posts, taken = split_taken(Post, posts)
+    for post in posts:
+        post.render_text()
+    bulk_create_dated(Post, posts, 'pub_date')
+    # Сигналы при bulk_create не срабатывают: всё, что они делают для
+    # одного поста, здесь делается для пачки.
+    search.get_backend().index_many(posts)
+    followers = Follow.objects.filter(
+        author_id__in=users.values(), fanout=True
+    ).values_list('author_id', 'user_id')
+    by_author = {}
+    for author_id, user_id in followers.iterator():
+        by_author.setdefault(author_id, []).append(user_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id, post_id=post.pk,
+                author_id=post.author_id, pub_date=post.pub_date,
+            )
+            for post in posts
+            for user_id in by_author.get(post.author_id, ())
+        ),
+        batch_size=timeline.BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    counters.repair(
+        Profile.objects.filter(user_id__in=users.values()),
+        counters.profile_counts,
+    )
+    caching.bump(
+        (caching.FEED,),
+        *((caching.AUTHOR, pk) for pk in users.values()),
+        *((caching.GROUP, pk) for pk in groups.values()),
+    )
+    return taken
+
+
+def import_comments(rows):
+    users = user_ids(row['author'] for row in rows)
+    post_ids = {int(row['post']) for row in rows}
+    comments = [
+        Comment(
+            pk=int(row['id']),
+            post_id=int(row['post']),
+            author_id=users[row['author']],
+            text=row['text'],
+            created=parse_datetime(row['created']),
+        )
+        for row in rows
+    ]
+    comments, taken = split_taken(Comment, comments)
+    bulk_create_dated(Comment, comments, 'created')
+    counters.repair(
+        Post.objects.filter(pk__in=post_ids), counters.post_counts
+    )
+    caching.bump(*((caching.POST, pk) for pk in post_ids))
+    return taken
+
+
+def import_follows(rows):
+    users = user_ids(
+        name for row in rows for name in (row['user'], row['author'])
+    )
+    pairs = {
+        (users[row['user']], users[row['author']])
+        for row in rows
+        if row['user'] != row['author']
+    }
+    follows = Follow.objects.filter(
+        author_id__in=users.values(), user_id__in=users.values()
+    )
+    pairs -= set(follows.values_list('user_id', 'author_id'))
+    Follow.objects.bulk_create(
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in pairs
+    )
+    counters.repair(
+        Profile.objects.filter(user_id__in=users.values()),
+        counters.profile_counts,
+    )
+    # Как при подписке на сайте, решение о раскладке принимается один раз
+    # — при создании подписки; старые подписки не трогаем.
+    celebrities = Profile.objects.filter(
+        user_id__in={author_id for _, author_id in pairs},
+        followers_count__gte=timeline.CELEBRITY_FOLLOWERS,
+    ).values_list('user_id', flat=True)
+    for author_id in celebrities:
+        Follow.objects.filter(author_id=author_id, user_id__in=[
+            user_id for user_id, followed in pairs if followed == author_id
+        ]).update(fanout=False)
+    # Ленты дополняются только для новых подписок: у старых посты уже
+    # разложены.
+    timeline.backfill_many(
+        follow for follow in follows.filter(fanout=True).only(
+            'user', 'author'
+        )
+        if (follow.user_id, follow.author_id) in pairs
+    )
+    caching.bump(*((caching.AUTHOR, pk) for pk in users.values()))
+
+
+IMPORTERS = {
+    'groups': import_groups,
+    'posts': import_posts,
+    'comments': import_comments,
+    'follows': import_follows,
+}
+
+
+def import_batch(kind, rows):
+    """Загружает пачку; возвращает id, пропущенные как уже занятые."""
+    with transaction.atomic():
+        return IMPORTERS[kind](rows) or []
+
+
+def reset_sequences():
+    """После вставки явных id сдвигает счётчики id (нужно PostgreSQL)."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [Post, Comment]
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
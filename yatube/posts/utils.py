@@ -1,10 +1,151 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import math
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 NUM_OF_POSTS = 10
+NUM_OF_COMMENTS = 20
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def encode_cursor(direction, value=None, pk=None):
+    """Упаковывает позицию в ленте в непрозрачную строку для URL."""
+    raw = direction
+    if value is not None:
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        raw += f'{value}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def parse_position(value):
+    """Значение ключа из курсора: дата или ранг поиска."""
+    try:
+        parsed = parse_datetime(value) or float(value)
+    except ValueError:
+        return None
+    if isinstance(parsed, float) and not math.isfinite(parsed):
+        return None
+    return parsed
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор; битый курсор означает первую страницу."""
+    if not cursor:
+        return FORWARD, None
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return FORWARD, None
+    direction, position = raw[:1], raw[1:]
+    if direction not in (FORWARD, BACKWARD):
+        return FORWARD, None
+    if not position:
+        return direction, None
+    value, _, pk = position.rpartition('|')
+    value = parse_position(value)
+    if value is None or not pk.isdigit():
+        return FORWARD, None
+    return direction, (value, int(pk))
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по паре (key, pk).
+
+    Не выполняет COUNT(*) и OFFSET: каждая страница выбирается одним
+    запросом по индексу от позиции, зашитой в курсор, поэтому глубокие
+    страницы стоят столько же, сколько первая.
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date',
+                 descending=True):
+        super().__init__(object_list, per_page)
+        self.key = key
+        self.descending = descending
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.last_cursor = encode_cursor(BACKWARD)
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        """Число страниц в окне вокруг текущей: полный счёт не ведётся."""
+        return self._num_pages
+
+    def _check_object_list_is_ordered(self):
+        # Порядок задаёт сам window() через order_by по ключу курсора.
+        pass
+
+    def _ordering(self, backward):
+        sign = '-' if self.descending != backward else ''
+        return f'{sign}{self.key}', f'{sign}pk'
+
+    def _seek(self, position, backward):
+        # Нестрогое условие вынесено отдельно, чтобы база могла начать
+        # проход по индексу прямо с позиции курсора.
+        value, pk = position
+        lookup = 'lt' if self.descending != backward else 'gt'
+        return Q(**{f'{self.key}__{lookup}e': value}) & (
+            Q(**{f'{self.key}__{lookup}': value})
+            | Q(**{f'pk__{lookup}': pk})
+        )
+
+    def _position(self, obj):
+        return getattr(obj, self.key), obj.pk
+
+    def window(self, cursor=None):
+        """Запрос страницы: не больше per_page + 1 строк от курсора."""
+        direction, position = decode_cursor(cursor)
+        backward = direction == BACKWARD
+        queryset = self.object_list
+        if position is not None:
+            queryset = queryset.filter(self._seek(position, backward))
+        queryset = queryset.order_by(*self._ordering(backward))
+        return queryset[:self.per_page + 1]
+
+    def page(self, cursor=None):
+        direction, position = decode_cursor(cursor)
+        backward = direction == BACKWARD
+        rows = list(self.window(cursor))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backward:
+            rows.reverse()
+            has_previous, has_next = has_more, position is not None
+        else:
+            has_previous, has_next = position is not None, has_more
+        if has_next and rows:
+            self.next_cursor = encode_cursor(
+                FORWARD, *self._position(rows[-1])
+            )
+        if has_previous and rows:
+            self.previous_cursor = encode_cursor(
+                BACKWARD, *self._position(rows[0])
+            )
+        number = 2 if self.previous_cursor else 1
+        self._num_pages = number + 1 if self.next_cursor else number
+        return Page(rows, number, self)
+
+    get_page = page
+
+
+def get_page_context(posts, request, key='pub_date'):
+    paginator = CursorPaginator(posts, NUM_OF_POSTS, key=key)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    return page_obj
 
 
-def get_page_context(posts, request):
-    paginator = Paginator(posts, NUM_OF_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def get_comments_page(comments, request):
+    """Страница комментариев; ?order=newest показывает сначала новые."""
+    newest_first = request.GET.get('order') == 'newest'
+    paginator = CursorPaginator(
+        comments, NUM_OF_COMMENTS, key='created', descending=newest_first
+    )
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     return page_obj
@@ -1,24 +1,44 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
 
-from .forms import CommentForm, PostForm
+from . import renditions, thumbnails
+from .caching import (CACHE_TIMEOUT, FEED, cache_for_anonymous,
+                      conditional_page, feed_scopes, generation_key,
+                      get_generations, group_scopes, post_scopes,
+                      profile_scopes)
+from .forms import CommentForm, PostForm, SearchForm
 from .models import Follow, Group, Post, User
-from .utils import get_page_context
+from .search import search_posts
+from .timeline import get_follow_page
+from .utils import get_comments_page, get_page_context
 
 
+def comments_of(post):
+    return post.comments.select_related('author').only(
+        'text', 'created', 'post', 'author', 'author__username'
+    )
+
+
+@conditional_page(feed_scopes)
+@cache_for_anonymous(feed_scopes)
 def index(request):
-    posts = Post.objects.select_related('author')
+    posts = Post.objects.feed()
     page_obj = get_page_context(posts, request)
+    generation, = get_generations([generation_key(FEED)])
     context = {
         'posts': posts,
         'page_obj': page_obj,
+        'feed_generation': generation,
+        'cache_timeout': CACHE_TIMEOUT,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_scopes)
+@cache_for_anonymous(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.feed()
     page_obj = get_page_context(posts, request)
     context = {
         'group': group,
@@ -27,9 +47,13 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_scopes)
+@cache_for_anonymous(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    posts = author.posts.feed()
     page_obj = get_page_context(posts, request)
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -44,16 +68,56 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_scopes)
+@cache_for_anonymous(post_scopes)
 def post_detail(request, post_id):
-    posts = get_object_or_404(Post, pk=post_id)
+    posts = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), pk=post_id
+    )
     form = CommentForm()
+    comments = get_comments_page(comments_of(posts), request)
     context = {
         'posts': posts,
         'form': form,
+        'comments': comments,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    form = SearchForm(request.GET or None)
+    posts = Post.objects.feed()
+    query = ''
+    if form.is_valid():
+        query = form.cleaned_data['q']
+        if form.cleaned_data['group']:
+            posts = posts.filter(group=form.cleaned_data['group'])
+        if form.cleaned_data['author']:
+            posts = posts.filter(
+                author__username=form.cleaned_data['author']
+            )
+    posts = search_posts(posts, query)
+    page_obj = get_page_context(posts, request, key='rank')
+    page_query = request.GET.copy()
+    page_query.pop('cursor', None)
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'page_query': page_query.urlencode(),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def post_comments(request, post_id):
+    posts = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = get_comments_page(comments_of(posts), request)
+    context = {
+        'posts': posts,
+        'comments': comments,
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -64,6 +128,8 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post.image)
+        renditions.schedule(post)
         return redirect('posts:profile', post.author.username)
     return render(request, 'posts/create_post.html', {'form': form, })
 
@@ -79,7 +145,10 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image)
+            renditions.schedule(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -104,10 +173,8 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_context(posts, request)
+    page_obj = get_follow_page(request.user, request)
     context = {
-        'posts': posts,
         'page_obj': page_obj,
     }
     return render(request, 'posts/follow.html', context)
@@ -12,24 +12,43 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+# Профиль настроек из DJANGO_PROFILE: dev — разработка, test — прогон
+# тестов (manage.py test выбирает его сам, pytest — через
+# yatube.settings_test), prod — боевой сервер.
+# Профиль задаёт только умолчания: переменные окружения ниже по-прежнему
+# их перекрывают. Что в текущих настройках мешает скорости, показывает
+# manage.py check_performance.
+PROFILES = ('dev', 'test', 'prod')
+PROFILE = os.environ.get('DJANGO_PROFILE', 'dev')
+if PROFILE not in PROFILES:
+    raise ImproperlyConfigured(
+        f'DJANGO_PROFILE должен быть одним из: {", ".join(PROFILES)}'
+    )
+PROD = PROFILE == 'prod'
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'somr*@tht755v426ajf2s7(3&x)gqzqk=ga&m@nu7)!q!(#(-k'
+SECRET_KEY = os.environ.get('SECRET_KEY')
+if not SECRET_KEY:
+    if PROD:
+        raise ImproperlyConfigured('В профиле prod нужен SECRET_KEY')
+    SECRET_KEY = 'somr*@tht755v426ajf2s7(3&x)gqzqk=ga&m@nu7)!q!(#(-k'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# В отладке Django копит каждый SQL-запрос в connection.queries и не
+# кэширует скомпилированные шаблоны.
+DEBUG = os.environ.get('DEBUG', '1' if PROFILE == 'dev' else '0') == '1'
 
 ALLOWED_HOSTS = [
-    'localhost',
-    '127.0.0.1',
-    '[::1]',
-    'testserver',
+    host for host in os.environ.get(
+        'ALLOWED_HOSTS', 'localhost,127.0.0.1,[::1],testserver'
+    ).split(',')
+    if host
 ]
 
 
@@ -46,10 +65,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,11 +84,19 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if PROD:
+    # Шаблоны разбираются один раз на процесс, а не на каждый рендер.
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.instrumentation.InstrumentedTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -75,6 +105,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
             ],
+            'loaders': TEMPLATE_LOADERS,
         },
     },
 ]
@@ -85,12 +116,83 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# База выбирается переменной DB_ENGINE. Соединения живут DB_CONN_MAX_AGE
+# секунд, а не открываются заново на каждый запрос. PostgreSQL вдобавок
+# держит пул соединений в процессе; SQLite получает прагмы при каждом
+# подключении: WAL пускает чтения параллельно с записью, NORMAL не ждёт
+# fsync на каждой транзакции, busy_timeout ждёт блокировку вместо
+# немедленной ошибки «database is locked».
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+DB_CONN_MAX_AGE = int(
+    os.environ.get('DB_CONN_MAX_AGE', 600 if PROD else 60)
+)
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'yatube'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                'pool_min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+                'pool_max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            },
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': os.environ.get(
+                'DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+            ),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                'pragmas': {
+                    'journal_mode': os.environ.get(
+                        'SQLITE_JOURNAL_MODE', 'WAL'
+                    ),
+                    'synchronous': os.environ.get(
+                        'SQLITE_SYNCHRONOUS', 'NORMAL'
+                    ),
+                    'mmap_size': int(
+                        os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+                    ),
+                    'busy_timeout': int(
+                        os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)
+                    ),
+                },
+            },
+        }
+    }
+
+
+# Реплики для чтения: через запятую пути к копиям файла SQLite или
+# хосты PostgreSQL (host[:port]). Маршрутизатор шлёт на них чтения
+# GET-запросов; кто недавно писал, REPLICA_PIN_SECONDS читает с
+# основной базы, а недоступная реплика REPLICA_RETRY_SECONDS не
+# используется.
+DB_REPLICAS = [
+    location for location in os.environ.get('DB_REPLICAS', '').split(',')
+    if location
+]
+for number, location in enumerate(DB_REPLICAS, 1):
+    replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if DB_ENGINE == 'postgresql':
+        host, _, port = location.partition(':')
+        replica.update(HOST=host, PORT=port or replica['PORT'])
+    else:
+        replica['NAME'] = location
+    DATABASES[f'replica{number}'] = replica
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+REPLICA_RETRY_SECONDS = int(os.environ.get('REPLICA_RETRY_SECONDS', 30))
 
 
 # Password validation
@@ -111,6 +213,17 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+if PROFILE == 'test':
+    # Медленный PBKDF2 в тестах только тратит время на create_user.
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Сессия вошедшего пользователя в prod читается из кэша, а не запросом к
+# базе на каждый просмотр.
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if PROD
+    else 'django.contrib.sessions.backends.db'
+)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
@@ -131,10 +244,32 @@ USE_TZ = True
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Кто отдаёт MEDIA_ROOT: off — прокси по MEDIA_URL; app — приложение
+# (ETag, диапазоны, sendfile); x-accel — nginx по X-Accel-Redirect на
+# внутренний адрес MEDIA_ACCEL_PREFIX; x-sendfile — Apache или lighttpd
+# по X-Sendfile. Подробнее — в core/media.py.
+MEDIA_SERVING = os.environ.get('MEDIA_SERVING', 'off' if PROD else 'app')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Имена файлов здесь производны от уникального оригинала и не
+# переиспользуются: размеры картинок и миниатюры sorl.
+MEDIA_IMMUTABLE_PREFIXES = ['posts/renditions/', 'cache/']
 
 STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.environ.get(
+    'STATIC_ROOT', os.path.join(BASE_DIR, 'static_root')
+)
+# В prod имена файлов статики содержат хэш содержимого, поэтому их можно
+# кэшировать в браузере надолго, а рядом лежат копии .gz и .br. Нужен
+# collectstatic перед запуском.
+STATICFILES_STORAGE = (
+    'core.staticfiles.CompressedManifestStaticFilesStorage' if PROD
+    else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+# Статику из STATIC_ROOT отдаёт само приложение — для запуска без
+# прокси перед ним. С прокси лучше отдавать STATIC_ROOT им.
+SERVE_STATIC = os.environ.get('SERVE_STATIC', '0') == '1'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -143,10 +278,110 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 
+# Общий уровень кэша выбирается переменной CACHE_BACKEND: locmem годится
+# для одного процесса, file и memcached (нужен python-memcached) видны
+# всем воркерам; в prod по умолчанию memcached. Перед ним стоит LRU
+# процесса, который сверяется с общим кэшем в начале запроса. Стандартных
+# 300 записей locmem и file не хватает даже на карточки одной ленты.
+CACHE_MAX_ENTRIES = int(
+    os.environ.get('CACHE_MAX_ENTRIES', 50000 if PROD else 10000)
+)
+SHARED_CACHES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': int(os.environ.get(
+                'CACHE_LOCAL_MAX_ENTRIES', 5000 if PROD else 500
+            )),
+            'LOCAL_TIMEOUT': 60,
+            # Локально держатся только часто читаемые ключи. Поколения
+            # меняются, и их запись сбрасывает копии у других воркеров;
+            # страницы и фрагменты шаблонов под своим ключом не меняются.
+            # Сессии и прочее читаются из общего кэша.
+            'LOCAL_MUTABLE_PREFIXES': ['generation:'],
+            'LOCAL_IMMUTABLE_PREFIXES': ['page:', 'template.cache.'],
+        },
+    },
+    'shared': SHARED_CACHES[
+        os.environ.get('CACHE_BACKEND', 'memcached' if PROD else 'locmem')
+    ],
 }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Миниатюры строятся в пуле потоков, а не внутри запроса;
+# при THUMBNAIL_WORKERS=0 — сразу, как раньше. В профиле test пул
+# выключен: фоновые потоки переживают ответ, а тесты сразу после него
+# удаляют временный MEDIA_ROOT.
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+THUMBNAIL_WORKERS = int(
+    os.environ.get('THUMBNAIL_WORKERS', 0 if PROFILE == 'test' else 2)
+)
+
+# Бэкенд поиска: fts5 (только SQLite), python — инвертированный индекс
+# в таблице posts_searchterm; auto выбирает FTS5, если он доступен.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+
+# Доля запросов, для которых замеряются SQL, шаблоны и кэш (от 0 до 1).
+# Итоги — в заголовке Server-Timing (в отладке или для персонала) и на
+# странице core:performance. Тесты замеров включают их сами.
+PERF_SAMPLE_RATE = float(os.environ.get(
+    'PERF_SAMPLE_RATE', {'dev': 1, 'test': 0, 'prod': 0.01}[PROFILE]
+))
+
+# Журнал медленных (дольше SLOW_QUERY_MS) и повторяющихся (от
+# DUPLICATE_QUERY_THRESHOLD одинаковых за запрос) запросов к базе.
+# Ведётся только для запросов, попавших в выборку PERF_SAMPLE_RATE.
+QUERY_DIAGNOSTICS = os.environ.get(
+    'QUERY_DIAGNOSTICS', '0' if PROFILE == 'test' else '1'
+) == '1'
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+DUPLICATE_QUERY_THRESHOLD = int(
+    os.environ.get('DUPLICATE_QUERY_THRESHOLD', 3)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.diagnostics.JsonFormatter'},
+    },
+    'handlers': {
+        'queries': {
+            'class': 'core.diagnostics.QueryLogHandler',
+            'filename': os.environ.get(
+                'QUERY_LOG', os.path.join(BASE_DIR, 'logs', 'queries.log')
+            ),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'yatube.queries': {
+            'handlers': ['queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,10 @@
+"""Настройки прогона тестов через pytest: профиль test.
+
+manage.py test выбирает профиль сам, а pytest-django загружает настройки
+раньше любого conftest, поэтому профиль задаётся здесь.
+"""
+import os
+
+os.environ.setdefault('DJANGO_PROFILE', 'test')
+
+from .settings import *  # noqa: E402,F401,F403
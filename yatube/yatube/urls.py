@@ -1,8 +1,9 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core import media, staticfiles
+
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.permission_denied'
 
@@ -12,9 +13,16 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('core/', include('core.urls', namespace='core')),
+    path('api/v1/', include('api.urls', namespace='api')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
+if settings.SERVE_STATIC:
+    urlpatterns.append(path(
+        f'{settings.STATIC_URL.lstrip("/")}<path:path>', staticfiles.serve
+    ))
+
+if settings.MEDIA_SERVING != 'off':
+    urlpatterns.append(path(
+        f'{settings.MEDIA_URL.lstrip("/")}<path:path>', media.serve
+    ))